@@ -5,6 +5,9 @@ from . import ops
 
 REGISTRY = {}
 
+# op_path => initialized schema.OpSchema, see init_op
+INIT_CACHE = {}
+
 def register(*op_paths):
     """
     For each op_path in `op_paths`, instantiates a schema.OpSchema instance
@@ -61,13 +64,29 @@ def list_schemas():
 def init_op(op_path):
     """
     Returns an initialized schema.OpSchema for `op_path`, but does not wrap the
-    TensorFlow op with it.
+    TensorFlow op with it.  The schema is built once per process and shared
+    thereafter, including its call-time state.  Use clear_init_cache() to
+    build a fresh one on the next call.
     """
-    op = schema.OpSchema(op_path)
-    schema_module = importlib.import_module(f'.ops.{op_path}', __name__)
-    op._init(schema_module.init_schema)
+    op = INIT_CACHE.get(op_path, None)
+    if op is None:
+        op = schema.OpSchema(op_path)
+        schema_module = importlib.import_module(f'.ops.{op_path}', __name__)
+        op._init(schema_module.init_schema)
+        INIT_CACHE[op_path] = op
     return op
 
+def clear_init_cache(*op_paths):
+    """
+    Discard the schemas built by init_op for each op in `op_paths`, or for all
+    ops if none are given.  Registered ops keep the schema they were wrapped
+    with until de-registered.
+    """
+    if len(op_paths) == 0:
+        INIT_CACHE.clear()
+    for op_path in op_paths:
+        INIT_CACHE.pop(op_path, None)
+
 def _register(op_path):
     """
     Instantiates an initialized schema.OpSchema for `op_path`, and wraps the
@@ -92,6 +111,7 @@ def _unregister(op_path):
         raise RuntimeError(
             f'Op path \'{op_path}\' is not registered so cannot be '
             f'de-registered')
+    INIT_CACHE.pop(op_path, None)
     func_name = op_path.rsplit('.',1)[1]
     setattr(op.framework_mod, func_name, op.framework_op)
 
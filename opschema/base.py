@@ -2,7 +2,8 @@ import tensorflow as tf
 import numpy as np
 import enum
 import re
-from collections import namedtuple, OrderedDict
+from functools import lru_cache
+from collections import namedtuple
 from .error import SchemaError
 from . import fgraph
 from . import oparg
@@ -45,12 +46,20 @@ def list_phrase_or(items):
     else:
         return ', '.join(str(i) for i in items[:-1]) + ' or ' + str(items[-1])
 
-def non_negative(shape):
-    if isinstance(shape, int):
-        return shape >= 0
-    else:
-        return all(s >= 0 for s in shape)
 
+def freeze(val):
+    """
+    Return a hashable equivalent of {val}, converting any nested lists, tuples
+    and dicts to tuples.  Raises TypeError if {val} contains other unhashable
+    values.
+    """
+    if isinstance(val, dict):
+        return tuple((k, freeze(v)) for k, v in val.items())
+    elif isinstance(val, (list, tuple)):
+        return tuple(freeze(v) for v in val)
+    else:
+        hash(val)
+        return val
 
 def ungroup_dims(gr_dims_map):
     # gr_dims_map is e.g. { 'bc': ([1,2], [2,3]), 'e': [5,6] }
@@ -59,7 +68,7 @@ def ungroup_dims(gr_dims_map):
         if len(sig) == 1:
             dims_map[sig] = dims
         else:
-            dims_map.update(dict(zip(sig, dims)))
+            dims_map.update(zip(sig, dims))
     return dims_map
 
 def broadcastable_to(dims_list, rank):
@@ -89,9 +98,9 @@ def range_under_size(idx_ranges, max_prod, rng):
     if any(lo > hi for lo, hi in idx_ranges):
         raise SchemaError(f'range_under_size: invalid ranges: {idx_ranges}')
 
-    lows = [lo for lo, _ in idx_ranges]
-    ncomp = len(idx_ranges)
-    runs = [np.prod(lows[i+1:], dtype=int) for i in range(ncomp)]
+    lows = np.array([lo for lo, _ in idx_ranges], dtype=int)
+    # runs[i] = prod(lows[i+1:]), computed as a reversed cumulative product
+    runs = np.append(np.cumprod(lows[:0:-1])[::-1], 1)
     if lows[0] * runs[0] > max_prod:
         raise SchemaError(
             f'range_under_size: idx_ranges {idx_ranges} '
@@ -110,16 +119,6 @@ def range_under_size(idx_ranges, max_prod, rng):
         dims.append(d)
     return dims
 
-class ShapeKind(enum.Enum):
-    """
-    For describing the kind of input that defines a shape
-    """
-    DataTensor = 0
-    List = 1
-    Int = 2
-    Tensor = 3
-    Tensor2D = 4
-
 class ShapeEdit(object):
     def __init__(self, op, index_ranks, arg_sigs, layout):
         self.op = op
@@ -192,20 +191,16 @@ class ShapeEdit(object):
         # create arg => template map
         arg_templ = {}
         for arg, sig in self.arg_sigs.items():
-            templ = tuple(idx for idx in sig for _ in
-                    range(self.index_ranks[idx]))
-            arg_templ[arg] = templ
+            templ = ''.join(idx * self.index_ranks[idx] for idx in sig)
+            arg_templ[arg] = tuple(templ)
         return arg_templ
 
     def arg_index_slice(self, arg, idx):
         # return the slice that idx takes up in the arg shape 
-        sig = self.arg_sigs[arg]
-        off = 0
-        for tmp_idx in sig:
-            rank = self.index_ranks[tmp_idx]
+        arg_slices = self.op._arg_slices(self.index_ranks, self.arg_sigs)
+        for tmp_idx, beg, end in arg_slices[arg]:
             if tmp_idx == idx:
-                return off, off + rank 
-            off += rank
+                return beg, end
 
     def get_input_dims(self, use_scalars=False):
         # return the imputed index dims, or raise an error if ambiguous
@@ -328,21 +323,23 @@ class DTypesEdit(object):
     def cost(self):
         return 0 if self.kind is None else 1
 
-def parse_dtype_expr(type_expr):
-    # return the matching dtypes 
-    exprs = {
-            'int': [8, 16, 32, 64],
-            'uint': [8, 16, 32, 64],
-            'float': [16, 32, 64],
-            'qint': [8, 16, 32],
-            'bfloat': [16],
-            'bool': [''],
-            'complex': [64, 128]
-            }
-
-    types = [ ', '.join(f'{k}{v}' for v in exprs[k]) for k in exprs ]
+# dtype name prefix => valid sizes
+DTYPE_EXPRS = {
+        'int': [8, 16, 32, 64],
+        'uint': [8, 16, 32, 64],
+        'float': [16, 32, 64],
+        'qint': [8, 16, 32],
+        'bfloat': [16],
+        'bool': [''],
+        'complex': [64, 128]
+        }
+
+DTYPE_EXPR_RE = re.compile('([a-z]+)(8|16|32|64|128)?([\+\-])?')
+
+def _dtype_expr_error(type_expr):
+    types = [ ', '.join(f'{k}{v}' for v in DTYPE_EXPRS[k]) for k in DTYPE_EXPRS ]
     type_str = '\n'.join(t for t in types)
-    err_msg = SchemaError(
+    return SchemaError(
         f'Received invalid dtype expression \'{type_expr}\'.\n'
         f'dtype expression must match the pattern:\n'
         f'([a-z]+)(8|16|32|64|128)?([\+\-])?\n'
@@ -354,31 +351,41 @@ def parse_dtype_expr(type_expr):
         f'{type_str}\n'
         )
 
+@lru_cache(maxsize=None)
+def parse_dtype_expr(type_expr):
+    # return the matching dtype names as a tuple.  schemas repeat the same
+    # few expressions, so results are memoized
     # expect format to be {pfx}{q}[+-]*
-    ma = re.match('([a-z]+)(8|16|32|64|128)?([\+\-])?', type_expr)
+    ma = DTYPE_EXPR_RE.match(type_expr)
     if ma is None:
-        raise err_msg
+        raise _dtype_expr_error(type_expr)
     pfx, q, rng = ma.groups()
+    sizes = DTYPE_EXPRS.get(pfx, None)
+    if sizes is None:
+        raise _dtype_expr_error(type_expr)
     if q is None:
-        ids = [ f'{pfx}{sz}' for sz in exprs[pfx] ]
+        ids = [ f'{pfx}{sz}' for sz in sizes ]
     else:
         if rng is None:
             ids = [ type_expr ]
         elif rng == '+':
-            ids = [ f'{pfx}{sz}' for sz in exprs[pfx] if sz >= int(q) ]
+            ids = [ f'{pfx}{sz}' for sz in sizes if sz >= int(q) ]
         else:
-            ids = [ f'{pfx}{sz}' for sz in exprs[pfx] if sz <= int(q) ]
+            ids = [ f'{pfx}{sz}' for sz in sizes if sz <= int(q) ]
     try:
         dtypes = [ tf.dtypes.as_dtype(i) for i in ids ]
     except TypeError:
-        raise err_msg
-    return ids
+        raise _dtype_expr_error(type_expr)
+    return tuple(ids)
 
 class ComboRule(object):
     def __init__(self):
         # tensor => [excluded_dtype, ...], None means all are excluded
         self.dtypes = None 
 
+        # tensor => {excluded_dtype, ...}, the same contents as self.dtypes
+        self.dtype_sets = None
+
         # idx => [excluded_rank, ...], None means all are excluded 
         self.ranks = None 
 
@@ -391,11 +398,17 @@ class ComboRule(object):
         return f
 
     def exclude_dtypes(self, arg, *dtype_exprs):
-        self.dtypes = {}
+        # called once per tensor in the combo, so earlier tensors are kept
+        if self.dtypes is None:
+            self.dtypes = {}
+            self.dtype_sets = {}
+        excluded = self.dtypes.setdefault(arg, [])
+        seen = self.dtype_sets.setdefault(arg, set())
         for dtype_expr in dtype_exprs:
-            dtypes = parse_dtype_expr(dtype_expr)
-            excluded = self.dtypes.setdefault(arg, [])
-            excluded.extend(dtypes)
+            for dtype in parse_dtype_expr(dtype_expr):
+                if dtype not in seen:
+                    seen.add(dtype)
+                    excluded.append(dtype)
 
     def exclude_rank(self, idx, *ranks):
         if self.ranks is None:
@@ -411,7 +424,7 @@ class ComboRule(object):
     def match(self, obs_dtypes, index_ranks, layout):
         # return True if this ComboRule matches the observations
         if self.dtypes is not None:
-            for arg, dtypes in self.dtypes.items():
+            for arg, dtypes in self.dtype_sets.items():
                 obs_dtype = obs_dtypes[arg]
                 if obs_dtype not in dtypes:
                     return False
@@ -434,9 +447,15 @@ class DTypeRules(object):
         self.initialized = False
         self.combos = []
 
+        # (dtypes, ranks, layout) items => matched ComboRule or None
+        self.match_cache = {}
+
         # arg => [valid_dtype, ...].  initialized from API call valid_dtypes 
         self.indiv_rules = {}
 
+        # arg => frozenset(valid_dtypes), for membership tests in edit()
+        self.indiv_sets = {}
+
         # target_tensor => source_tensor
         self.equate_rules = {}
 
@@ -447,6 +466,7 @@ class DTypeRules(object):
 
     def add_indiv_rule(self, tensor, valid_types):
         self.indiv_rules[tensor] = valid_types
+        self.indiv_sets[tensor] = frozenset(valid_types)
 
     def add_equate_rule(self, target_tensor, source_tensor):
         self.equate_rules[target_tensor] = source_tensor
@@ -490,10 +510,11 @@ class DTypeRules(object):
                     f'Known data tensors are: {self.data_tensors}'
                     f'Known indices are: {self.indices}')
         self.combos.append(combo_rule)
+        self.match_cache.clear()
 
     def edit(self, obs_dtypes, index_ranks, layout):
         # check each indiv rule
-        for arg, valid_dtypes in self.indiv_rules.items():
+        for arg, valid_dtypes in self.indiv_sets.items():
             obs_dtype = obs_dtypes[arg]
             if obs_dtype not in valid_dtypes:
                 return DTypesEdit('indiv', arg)
@@ -516,10 +537,18 @@ class DTypeRules(object):
         Returns a matching exclusion rule for the set of observed dtypes,
         index_ranks and layout.  If no rule matches, return None
         """
+        key = (tuple(obs_dtypes.items()), tuple(index_ranks.items()), layout)
+        try:
+            return self.match_cache[key]
+        except KeyError:
+            pass
+        matched = None
         for combo in self.combos:
             if combo.match(obs_dtypes, index_ranks, layout):
-                return combo
-        return None
+                matched = combo
+                break
+        self.match_cache[key] = matched
+        return matched
 
 class DataFormats(object):
     """
@@ -541,8 +570,12 @@ class DataFormats(object):
         else:
             key_func = lambda t: '___' if t is None else t[0]
             sorted_keys = sorted(formats.keys(), key=key_func)
-            self.formats = OrderedDict({k: formats[k] for k in sorted_keys})
+            self.formats = { k: formats[k] for k in sorted_keys }
             self.rank_index = rank_index
+        # the formats are fixed from here on
+        self.layout_count = len({ lr[0] for lr in self.formats.values() })
+        # (layout, rank) => data_format, see data_format
+        self.data_format_cache = {}
 
     def single(self):
         # return a pseudo-format for ops that have no switch for data_format
@@ -567,18 +600,38 @@ class DataFormats(object):
             return obs_args.get(self.arg_name, None)
 
     def num_layouts(self):
-        return len({ lr[0] for lr in self.formats.values() })
+        return self.layout_count
 
     def all_formats(self):
         return list(self.formats.keys())
 
+    def valid_format(self, data_format):
+        """
+        Return whether {data_format} is one of the registered formats
+        """
+        try:
+            return data_format in self.formats
+        except TypeError:
+            # an unhashable value cannot match any format
+            return False
+
     def data_format(self, layout, ranks):
         """
         Return the data_format corresponding to the layout and rank
         combination.
         """
-        items = self.formats.items()
         rank = None if self.rank_index is None else ranks[self.rank_index]
+        key = (layout, rank)
+        try:
+            return self.data_format_cache[key]
+        except KeyError:
+            df = self._find_format(layout, rank)
+            self.data_format_cache[key] = df
+            return df
+
+    def _find_format(self, layout, rank):
+        # the first format in order matching layout and rank
+        items = self.formats.items()
         if rank is None:
             return next((df for df, (l, _) in items if l == layout), None)
         else:
@@ -598,21 +651,23 @@ class DataFormats(object):
         """
         Return the layout corresponding with this data format
         """
-        if data_format not in self.formats:
+        try:
+            return self.formats[data_format][0]
+        except KeyError:
             raise RuntimeError(
                 f'{type(self).__qualname__}: received unknown data_format '
                 f'\'{data_format}\'')
-        return self.formats[data_format][0]
 
     def rank(self, data_format):
         """
         Return the rank corresponding with this data format
         """
-        if data_format not in self.formats:
+        try:
+            return self.formats[data_format][1]
+        except KeyError:
             raise RuntimeError(
                 f'{type(self).__qualname__}: received unknown data_format '
                 f'\'{data_format}\'')
-        return self.formats[data_format][1]
 
 class IndexPredicate(object):
     def __init__(self, name, cwise, pfunc, pfunc_t, indices):
@@ -621,6 +676,7 @@ class IndexPredicate(object):
         self.pfunc = pfunc
         self.pfunc_t = pfunc_t
         self.indices = indices
+        self.index_set = frozenset(indices)
 
     def get_formula(self, op, snake_case):
         inputs = tuple(op.index[idx].display_name(snake_case) for idx in
@@ -667,14 +723,22 @@ class SumRangeConstraint(object):
         self.sig = sig
         self.lo = lo
         self.hi = hi
+        # distinct indices of sig, in order
+        self.sig_idxs = tuple(dict.fromkeys(sig))
+        self.sig_len = len(sig)
 
     def __repr__(self):
         return f'{type(self).__name__}: RANK({self.sig}) in [{self.lo}, {self.hi}]'
 
     def __call__(self, **index_ranks):
-        prev = [ r for idx, r in index_ranks.items() if idx in self.sig ]
-        part = sum(prev)
-        final = (len(prev) + 1 == len(self.sig))
+        get = index_ranks.get
+        part, num_prev = 0, 0
+        for idx in self.sig_idxs:
+            r = get(idx)
+            if r is not None:
+                part += r
+                num_prev += 1
+        final = (num_prev + 1 == self.sig_len)
         lo = max(0, self.lo - part) if final else 0
         hi = max(0, self.hi - part)
         return lo, hi
@@ -685,8 +749,16 @@ class ShapeFuncConstraint(object):
     """
     def __init__(self, sig, func, shape_arg):
         self.sig = sig
+        self.sig_idxs = tuple(sig)
         self.func = func
         self.shape_arg = shape_arg
+        # the most recent shape value (as a tuple) and its value of func.
+        # During a single inference, the constraint is called once for each
+        # setting of index_ranks, always with the same observed shape.  The
+        # shape is compared by value, since callers may reuse and modify
+        # one list between calls
+        self.last_shape = None
+        self.last_rank = None
 
     def __repr__(self):
         r =  f'{type(self).__qualname__}: RANK({self.sig}) = '
@@ -695,11 +767,18 @@ class ShapeFuncConstraint(object):
 
     def __call__(self, obs_shapes, **index_ranks):
         shape = obs_shapes[self.shape_arg]
-        rank = self.func(shape)
+        key = shape if isinstance(shape, int) else tuple(shape)
+        if key != self.last_shape:
+            self.last_rank = self.func(shape)
+            self.last_shape = key
+        rank = self.last_rank
         if rank is None:
             return 0, -1
 
-        residual = sum(index_ranks.get(idx, 0) for idx in self.sig)
+        get = index_ranks.get
+        residual = 0
+        for idx in self.sig_idxs:
+            residual += get(idx, 0)
         target = rank - residual
         return target, target
 
@@ -710,6 +789,7 @@ class SigRankValueConstraint(object):
     def __init__(self, arg, sig):
         self.arg = arg
         self.sig = sig
+        self.sig_idxs = tuple(sig)
 
     def __repr__(self):
         r =  f'{type(self).__qualname__}: RANK({self.sig}) = {self.arg}'
@@ -717,7 +797,10 @@ class SigRankValueConstraint(object):
 
     def __call__(self, obs_args, **index_ranks):
         rank = obs_args[self.arg]
-        residual = sum(index_ranks.get(idx, 0) for idx in self.sig)
+        get = index_ranks.get
+        residual = 0
+        for idx in self.sig_idxs:
+            residual += get(idx, 0)
         target = rank - residual
         return target, target
 
@@ -771,8 +854,11 @@ class Fix(object):
         Display a logical, one-line summary of this fix, for indexing purposes
         """
         shape = self.shape
-        ranks = [shape.index_ranks[idx] for idx in shape.op.index.keys()]
-        rank_str = ','.join(str(r) for r in ranks)
+        ranks = tuple(shape.index_ranks[idx] for idx in shape.op.index.keys())
+        rank_str = shape.op.rank_str_cache.get(ranks, None)
+        if rank_str is None:
+            rank_str = ','.join(str(r) for r in ranks)
+            shape.op.rank_str_cache[ranks] = rank_str
         r =  f'L:{self.shape.layout}, R:{rank_str}'
         if self.df.cost() != 0:
             r += f' DF:{self.df.observed}=>{self.df.imputed}'
@@ -853,11 +939,14 @@ class RenderCompDims(object):
         self.init_dims_graph(inputs)
         comp_nodes = self.op._comp_dims_nodes()
         input_nodes = self.op._dims_input_nodes()
-        live_nodes = comp_nodes + input_nodes
-        gen = fgraph.gen_graph_map(live_nodes, comp_nodes, full_name=False)
-        result = list(gen)
-        assert len(result) == 1, 'Internal Error with comp graph'
-        return result[0]
+        # each of these nodes yields exactly one value, and the DimsInput nodes
+        # have no parents, so evaluating inputs and then the (topologically
+        # ordered) comp nodes in a straight line replaces gen_graph_map
+        for node in input_nodes + comp_nodes:
+            vals = list(node.values())
+            assert len(vals) == 1, 'Internal Error with comp graph'
+            node.set_cached(vals[0])
+        return { node.sub_name: node.get_cached() for node in comp_nodes }
 
     def get_olc(self):
         """
@@ -896,8 +985,7 @@ class RenderCompDims(object):
         codes = self.get_olc()
         descs = self.get_snake()
         sdims = self.get_sdims(input_dims)
-        comp_nodes = self.op._comp_dims_nodes()
-        comp_names = [ n.sub_name for n in comp_nodes ]
+        comp_names = self.op._comp_dims_names()
         formulas = {}
         for idx in comp_names:
             code_path = '{} = {}'.format(*codes[idx])
@@ -7,13 +7,18 @@ dimension (and possibly trailing custom arguments)
 
 2. a function accepting whole shapes of indexes as integer lists, and returning
 an integer list.
+
+Template functions (those ending in _t) are only ever called with hashable
+arguments (strings and integers), and are pure, so they are cached.
 """
 import numpy as np
 import math
+from functools import lru_cache
 
 def dilate(s, d):
     return s + max(0, s-1) * d
 
+@lru_cache(maxsize=None)
 def dilate_t(s,  d):
     return f'{s} + max(0, {s}-1) * {d}'
 
@@ -24,6 +29,7 @@ def conv(i, f, padding):
     else:
         return i
 
+@lru_cache(maxsize=None)
 def conv_t(i, f, padding):
     if padding == 'VALID':
         return f'{i} - {f} + 1'
@@ -36,6 +42,7 @@ def strided_conv(i, f, s, padding):
     else:
         return ceildiv(i, s)
 
+@lru_cache(maxsize=None)
 def strided_conv_t(i, f, s, padding):
     if padding == 'VALID':
         return f'ceil(({i} + {f} - 1) / {s})'
@@ -48,6 +55,7 @@ def tconv(i, f, padding):
     else:
         return i
 
+@lru_cache(maxsize=None)
 def tconv_t(i, f, padding):
     if padding == 'VALID':
         return f'{i} + {f} - 1'
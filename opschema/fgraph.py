@@ -1,5 +1,7 @@
 import inspect
 import enum
+import sys
+from functools import lru_cache
 from .error import SchemaError
 
 
@@ -23,11 +25,35 @@ print(node_reg)
 
 """
 
+def _intern(name):
+    # node names are used as registry keys and keyword argument names on
+    # every evaluation, so share one copy of each
+    return sys.intern(name) if isinstance(name, str) else name
+
+@lru_cache(maxsize=None)
 def node_name(func_node_class, name=None):
+    # called with the same few (class, name) pairs throughout, both to build
+    # and to look up nodes
     if name is None:
         return func_node_class.__name__
     else:
-        return f'{func_node_class.__name__}({name})'
+        return sys.intern(f'{func_node_class.__name__}({name})')
+
+# NodeFunc class => (num_named_pars, has *args, has **kwargs), see _call_params
+_call_params_cache = {}
+
+def _call_params(func):
+    # inspect.signature is slow, and every node of a given NodeFunc class has
+    # the same __call__ signature
+    key = type(func)
+    params = _call_params_cache.get(key, None)
+    if params is None:
+        pars = inspect.signature(func).parameters.values()
+        num_args = sum(p.kind == p.VAR_POSITIONAL for p in pars)
+        num_kwds = sum(p.kind == p.VAR_KEYWORD for p in pars)
+        params = (len(pars) - num_args - num_kwds, num_args > 0, num_kwds > 0)
+        _call_params_cache[key] = params
+    return params
 
 class NodeFunc(object):
     def __init__(self, name=None):
@@ -58,6 +84,12 @@ class FuncNode(object):
     # stores all created nodes
     registry = None
 
+    # schemas create many nodes, whose attributes are read on every
+    # evaluation
+    __slots__ = ('name', 'sub_name', 'use_subname', 'func', 'parents',
+            'use_parent_subname', 'parent_names', 'parent_set', 'children',
+            'cached_val', 'num_named_pars', 'vararg_type')
+
     def __init__(self, func, use_subname, num_named_pars, vararg_type):
         """
         num_named_pars is the number of named parameters that func takes. (any
@@ -65,12 +97,16 @@ class FuncNode(object):
         variable arg it has (*args, **kwargs, or neither)
 
         """
+        # both are interned once here, since they become registry keys and
+        # argument names.  func.name is interned by node_name
         self.name = func.name 
-        self.sub_name = func.sub_name
+        self.sub_name = _intern(func.sub_name)
         self.use_subname = use_subname
         self.func = func
         self.parents = []
         self.use_parent_subname = []
+        self.parent_names = [] # argument name each parent passes to func
+        self.parent_set = set() # names of parents, see _maybe_append_parent
         self.children = []
         self.cached_val = None
         self.num_named_pars = num_named_pars
@@ -111,42 +147,37 @@ class FuncNode(object):
                 f'{type(cls).__qualname__}: registry is not set.  Call '
                 f'set_registry(reg) with a map object first')
 
-        used_name = func.sub_name if pass_subname else func.name
+        used_name = _intern(func.sub_name if pass_subname else func.name)
 
         if used_name in cls.registry:
             raise SchemaError(
                 f'{type(cls).__qualname__}: node name \'{used_name}\' already '
                 f'exists in the registry.  Node names must be unique')
         
-        pars = inspect.signature(func).parameters.values()
-        args_par = next((p for p in pars if p.kind == p.VAR_POSITIONAL), None)
-        kwds_par = next((p for p in pars if p.kind == p.VAR_KEYWORD), None)
+        num_named_pars, has_args, has_kwds = _call_params(func)
         
-        if args_par is not None and kwds_par is not None:
+        if has_args and has_kwds:
             raise SchemaError(
                 f'{type(cls).__name__}: Function cannot have both **args and '
                 f'**kwargs in its signature')
-        wildcard = args_par or kwds_par
-        named_pars = [p for p in pars if p != wildcard]
 
-        if wildcard is None: 
-            if len(parents) != len(named_pars):
+        if not (has_args or has_kwds):
+            if len(parents) != num_named_pars:
                 raise SchemaError(
-                    f'{cls.__qualname__}: function takes {len(named_pars)} '
+                    f'{cls.__qualname__}: function takes {num_named_pars} '
                     f'arguments, but {len(parents)} parents provided ')
         else:
-            if len(parents) < len(named_pars):
+            if len(parents) < num_named_pars:
                 raise SchemaError(
-                    f'{cls.__qualname__}: function takes {len(named_pars)} '
+                    f'{cls.__qualname__}: function takes {num_named_pars} '
                     f'positional arguments but only {len(parents)} parents '
                     f'provided.')
-        num_named_pars = len(named_pars)
-        if wildcard is None:
-            vararg_type = VarArgs.Empty
-        elif wildcard == args_par:
+        if has_args:
             vararg_type = VarArgs.Positional
-        else:
+        elif has_kwds:
             vararg_type = VarArgs.Keyword
+        else:
+            vararg_type = VarArgs.Empty
 
         node = cls(func, pass_subname, num_named_pars, vararg_type)
         for pa in parents:
@@ -161,6 +192,15 @@ class FuncNode(object):
         """
         return cls._add_node(func, False, *parents)
 
+    @classmethod
+    def add_nodes(cls, funcs, *parents):
+        """
+        Add one node for each of {funcs}, each with the same {parents}, using
+        func.name as retrieval key and passed argument name.  Returns the list
+        of new nodes.
+        """
+        return [ cls._add_node(func, False, *parents) for func in funcs ]
+
     @classmethod
     def add_node_sn(cls, func, *parents):
         """
@@ -198,27 +238,29 @@ class FuncNode(object):
 
     @classmethod
     def find_unique_name(cls, prefix):
-        names = { n for n in cls.registry.keys() if n.startswith(prefix) }
-        if len(names) == 1:
-            return names.pop()
-        else:
-            return None
+        node = cls.find_unique(prefix)
+        return None if node is None else node.used_name()
 
     @classmethod
     def find_unique(cls, prefix):
-        found = []
+        """
+        Return the only node whose registry name starts with {prefix}, or None
+        if there are none or several.  The scan stops at a second match.
+        """
+        found = None
         for name, node in cls.registry.items():
             if name.startswith(prefix):
-                found.append(node)
-        if len(found) == 1:
-            return found[0]
-        else:
-            return None
+                if found is not None:
+                    return None
+                found = node
+        return found
 
     def _add_child(self, node, pass_subname):
         self.children.append(node)
         node.parents.append(self)
+        node.parent_set.add(self.name)
         node.use_parent_subname.append(pass_subname)
+        node.parent_names.append(self.sub_name if pass_subname else self.name)
 
     def add_child(self, node):
         self._add_child(node, False)
@@ -228,7 +270,9 @@ class FuncNode(object):
 
     def _append_parent(self, node, pass_subname):
         self.parents.append(node)
+        self.parent_set.add(node.name)
         self.use_parent_subname.append(pass_subname)
+        self.parent_names.append(node.sub_name if pass_subname else node.name)
         node.children.append(self)
 
     def append_parent(self, node):
@@ -245,9 +289,33 @@ class FuncNode(object):
         """
         self._append_parent(node, True)
 
+    def _append_parents(self, nodes, pass_subname):
+        # bulk version of _append_parent
+        nodes = list(nodes)
+        self.parents.extend(nodes)
+        self.parent_set.update(node.name for node in nodes)
+        self.use_parent_subname.extend([pass_subname] * len(nodes))
+        self.parent_names.extend(node.sub_name if pass_subname else node.name
+                for node in nodes)
+        for node in nodes:
+            node.children.append(self)
+
+    def append_parents(self, nodes):
+        """
+        Append each of {nodes} as a parent of this node, in order.
+        Pass node.name as the argument name to this node.
+        """
+        self._append_parents(nodes, False)
+
+    def append_parents_sn(self, nodes):
+        """
+        Append each of {nodes} as a parent of this node, in order.
+        Pass node.sub_name as the argument name to this node.
+        """
+        self._append_parents(nodes, True)
+
     def _maybe_append_parent(self, node, pass_subname):
-        pa = next((n for n in self.parents if n.name == node.name), None)
-        if pa is not None:
+        if node.name in self.parent_set:
             return
         self._append_parent(node, pass_subname)
 
@@ -272,23 +340,23 @@ class FuncNode(object):
         """
         Evaluate the current node based on cached values of the parents
         """
-        z = zip(self.parents, self.use_parent_subname)
-        all_args = [(n.sub_name if s else n.name, n.get_cached()) for n,s in z]
-        pos_args = [v for n,v in all_args[:self.num_named_pars]]
+        vals = [n.get_cached() for n in self.parents]
+        pos_args = vals[:self.num_named_pars]
         if self.vararg_type == VarArgs.Positional:
-            args = tuple(v for n,v in all_args[self.num_named_pars:])
+            args = tuple(vals[self.num_named_pars:])
             return self.func(*pos_args, *args)
         elif self.vararg_type == VarArgs.Keyword:
-            kwargs = {}
-            for pos in range(self.num_named_pars, len(all_args)):
-                name, val = all_args[pos]
-                if name is None:
-                    pa = self.parents[pos]
-                    raise SchemaError(
-                        f'{self.__class__.__name__} \'{self.name}\' has '
-                        f'arguments but parent {pos+1} '
-                        f'({pa.name}) has no usable name')
-                kwargs[name] = val
+            # hub nodes such as the signature and shape maps have one keyword
+            # parent per argument, so build the kwargs in one pass
+            num_pars = self.num_named_pars
+            kwargs = dict(zip(self.parent_names[num_pars:], vals[num_pars:]))
+            if None in kwargs:
+                pos = self.parent_names.index(None, num_pars)
+                pa = self.parents[pos]
+                raise SchemaError(
+                    f'{self.__class__.__name__} \'{self.name}\' has '
+                    f'arguments but parent {pos+1} '
+                    f'({pa.name}) has no usable name')
             return self.func(*pos_args, **kwargs)
         else:
             return self.func(*pos_args)
@@ -346,19 +414,15 @@ This combinatorial generation is produced using gen_graph_iterate
 """
 class GenNode(FuncNode):
     registry = {}
+    __slots__ = ()
 
     def __init__(self, *args):
         super().__init__(*args)
 
     def values(self):
-        vals = super().value()
-        yield from vals
-        return
-        try:
-            iter(vals)
-        except TypeError:
-            raise SchemaError(f'{self}: function does not return an iterable') 
-        yield from vals
+        # the function's own iterable is returned as is, rather than
+        # re-yielded through another generator frame per value
+        return super().value()
 """
 Predicate Graph API - a computation graph for predicates
 
@@ -374,6 +438,7 @@ Expect func to return a pair (success, value)
 """
 class PredNode(FuncNode):
     registry = {}
+    __slots__ = ('pred_parents', 'pred_children')
 
     def __init__(self, *args):
         super().__init__(*args)
@@ -406,7 +471,9 @@ class PredNode(FuncNode):
 def get_ancestors(*nodes):
     found = set()
     def dfs(n):
-        if n.name in found:
+        # ancestors shared through hub nodes are reached along many paths,
+        # so visit each only once
+        if n in found:
             return
         found.add(n)
         for pa in n.parents:
@@ -453,20 +520,19 @@ def _gen_graph(live_nodes, result_nodes, yield_map, full_name, op):
     current values of result_nodes (which must be a subset of live_nodes)
     and yield as a tuple
     """
-    # map from li => ri
+    live_nodes = _topo_sort(live_nodes)
+    live_pos = { node: li for li, node in enumerate(live_nodes) }
     for rn in result_nodes:
-        if rn not in live_nodes:
+        if rn not in live_pos:
             raise RuntimeError(
                 f'All nodes in result_nodes must be in live_nodes. Got '
                 f'result node \'{rn.name}\'.  Available live_nodes are: '
                 f'{", ".join(l.name for l in live_nodes)}')
 
-    live_nodes = _topo_sort(live_nodes)
+    # map from li => ri
     imap = [-1] * len(live_nodes)
-
     for ri, r in enumerate(result_nodes):
-        li = live_nodes.index(r)
-        imap[li] = ri
+        imap[live_pos[r]] = ri
 
     result = [None] * len(result_nodes)
     res_names = [r.name if full_name else r.sub_name for r in result_nodes]
@@ -525,7 +591,14 @@ def pred_graph_evaluate(*nodes):
     Evaluate PredNodes in dependency order until a predicate fails.
     If any predicate fails, return its value.  Otherwise, return None
     """
-    topo_nodes = _topo_sort(nodes)
+    return pred_graph_evaluate_sorted(_topo_sort(nodes))
+
+def pred_graph_evaluate_sorted(topo_nodes):
+    """
+    Like pred_graph_evaluate, but {topo_nodes} must already be in dependency
+    order, as returned by _topo_sort.  Use this to evaluate the same nodes
+    repeatedly without sorting them each time.
+    """
     for n in topo_nodes:
         if not n.evaluate():
             return n.get_cached()
@@ -2,6 +2,8 @@ import sys
 import math
 import enum
 import itertools
+import operator
+import functools
 from copy import copy
 from contextlib import contextmanager
 from .fgraph import FuncNode as F, NodeFunc
@@ -32,6 +34,26 @@ def get_max_dimsize(target_nelem, arg_ranks):
     # print(arg_ranks, dimsize)
     return dimsize
 
+def arg_input_keys(arg_names):
+    """
+    The keyword names under which the DimsInput parents for {arg_names} pass
+    their values to a GenDims or CompDims node
+    """
+    return tuple(fgraph.node_name(DimsInput, arg) for arg in arg_names)
+
+def tuple_getter(keys):
+    """
+    Return a function which maps a dict to the tuple of its values at {keys}.
+    Uses operator.itemgetter, which returns a bare value for a single key.
+    """
+    if len(keys) == 0:
+        return lambda d: ()
+    elif len(keys) == 1:
+        key = keys[0]
+        return lambda d: (d[key],)
+    else:
+        return operator.itemgetter(*keys)
+
 class Indel(enum.Enum):
     Insert = 0
     Delete = 1
@@ -55,14 +77,15 @@ class GenFunc(NodeFunc):
 
     @contextmanager
     def reserve_edit(self, dist):
-        doit = (dist <= self.op.avail_test_edits)
+        op = self.op
+        doit = (dist <= op.avail_test_edits)
         if doit:
-            self.op.avail_test_edits -= dist
+            op.avail_test_edits -= dist
         try:
             yield doit
         finally:
             if doit:
-                self.op.avail_test_edits += dist
+                op.avail_test_edits += dist
 
 class GenDims(NodeFunc):
     """
@@ -92,6 +115,8 @@ class GenDims(NodeFunc):
         self.yield_scalar = yield_scalar
         self.max_prod = max_prod
         self.arg_names = arg_names
+        self.arg_keys = arg_input_keys(arg_names)
+        self.get_input_dims = tuple_getter(in_sig)
         self.num_indexes = len(sig)
 
     @staticmethod
@@ -122,7 +147,7 @@ class GenDims(NodeFunc):
         else:
             for comp_ranges in pgen:
                 dims_list = []
-                for idx_range in list(zip(*comp_ranges)):
+                for idx_range in zip(*comp_ranges):
                     dims = base.range_under_size(idx_range, self.max_prod,
                             self.op.gen_rng)
                     dims_list.append(dims)
@@ -138,13 +163,10 @@ class GenDims(NodeFunc):
                 yield tuple(dims_flat)
 
     def __call__(self, index_ranks, **dims_and_args):
-        plist = [ (k,v) for k,v in dims_and_args.items() ]
-        nargs = len(self.arg_names)
-        rit = reversed([plist.pop() for _ in range(nargs)])
-        arg_vals = [v for _,v in rit]
-        grouped_dims_map = dict(plist)
-        dims_map = base.ungroup_dims(grouped_dims_map)
-        input_dims = [ dims_map[idx] for idx in self.in_sig ]
+        # after removing the arg values, only the grouped dims remain
+        arg_vals = [ dims_and_args.pop(k) for k in self.arg_keys ]
+        dims_map = base.ungroup_dims(dims_and_args)
+        input_dims = self.get_input_dims(dims_map)
 
         if self.yield_scalar:
             if not all(isinstance(d, int) for d in input_dims):
@@ -195,31 +217,59 @@ class CompDims(NodeFunc):
         self.tfunc = tfunc
         self.rank_idx = rank_idx
         self.arg_names = arg_names
+        self.arg_keys = arg_input_keys(arg_names)
+        self.get_input_dims = tuple_getter(in_sig)
         self.nargs = len(arg_names)
+        # LRU-cached func.  shared among all CompDims using func, so sized
+        # for the combined traffic of every registration
+        self.memo = op.comp_dims_memo.get(func, None)
+        if self.memo is None:
+            self.memo = functools.lru_cache(maxsize=4096, typed=True)(func)
+            op.comp_dims_memo[func] = self.memo
 
     @property
     def graphviz_name(self):
         ind_name = self.op.index[self.idx].display_name(True)
         return self.wrapped_name(ind_name)
 
-    def safe_func(self, *args):
+    def safe_func(self, *args, func=None):
+        func = self.func if func is None else func
         try:
-            return self.func(*args)
+            return func(*args)
         except BaseException as ex:
             raise SchemaError(
                 f'The function registered for computed index {self.sub_name} '
                 f'failed on the call: func{args}\n{ex}')
 
+    def memo_func(self, args):
+        """
+        Call safe_func(*{args}) through the LRU cache of recent results.
+        Registered functions must be pure (see OpSchema.comp_dims), so results
+        are reused across calls with identical arguments, and across computed
+        indexes registered with the same function.  Arguments of different
+        types, such as True and 1, are cached separately.  Unhashable
+        arguments bypass the cache.
+        """
+        try:
+            hash(args)
+        except TypeError:
+            return self.safe_func(*args)
+        return self.safe_func(*args, func=self.memo)
+
     def comp_cwise(self, index_ranks, input_dims, arg_vals):
         result = []
         rank = index_ranks[self.rank_idx]
-        if not base.broadcastable_to(input_dims, rank):
+        # an internal invariant rather than a schema check, so it scans the
+        # dims only in debug (non -O) runs
+        if __debug__ and not base.broadcastable_to(input_dims, rank):
             raise OpSchemaInternalError(
                 f'non-broadcastable dims: {input_dims}, {self.in_sig}'
                 f', {rank}')
+        # the arg values are the same for every component
+        arg_vals = tuple(arg_vals)
         for c in range(rank):
             ins = tuple(base.bcast_dim(dims, c) for dims in input_dims)
-            res = self.safe_func(*ins, *arg_vals)
+            res = self.memo_func(ins + arg_vals)
             if isinstance(res, tuple):
                 res = list(res)
             result.append(res)
@@ -249,32 +299,30 @@ class CompDims(NodeFunc):
         Compute dims, producing a lhs and rhs representation of the equation.
         For OneLetterCode and SnakeCaseDesc, index_ranks is ignored
         """
-        plist = [ (k,v) for k,v in dims_and_args.items() ]
-        rit = reversed([plist.pop() for _ in range(self.nargs)])
-        arg_vals = [v for _,v in rit]
-
-        if self.op.comp_dims_mode in (base.CompDimsMode.Dims,
-                base.CompDimsMode.StringDims):
-            grouped_dims_map = { k:v for k,v in plist }
-            dims_map = base.ungroup_dims(grouped_dims_map)
-
-        if self.op.comp_dims_mode == base.CompDimsMode.Dims:
-            input_dims = [ dims_map[idx] for idx in self.in_sig ]
+        # after removing the arg values, only the grouped dims remain
+        arg_vals = [ dims_and_args.pop(k) for k in self.arg_keys ]
+        mode = self.op.comp_dims_mode
+
+        # Dims mode is used on every inference, so it is tested first
+        if mode == base.CompDimsMode.Dims:
+            dims_map = base.ungroup_dims(dims_and_args)
+            input_dims = self.get_input_dims(dims_map)
             result = self.comp(index_ranks, input_dims, arg_vals)
             yield result
             return
 
-        if self.op.comp_dims_mode == base.CompDimsMode.StringDims:
+        if mode == base.CompDimsMode.StringDims:
             # dims_map values hold tuples
+            dims_map = base.ungroup_dims(dims_and_args)
             input_dims = [ dims_map[idx][0] for idx in self.in_sig ]
             lhs = self.comp(index_ranks, input_dims, arg_vals)
             templ_inputs = [base.dims_string(dims) for dims in input_dims]
 
-        elif self.op.comp_dims_mode == base.CompDimsMode.OneLetterCode:
+        elif mode == base.CompDimsMode.OneLetterCode:
             lhs = self.op.index[self.idx].display_name(False)
             templ_inputs = self.in_sig
 
-        elif self.op.comp_dims_mode == base.CompDimsMode.SnakeCaseDesc:
+        elif mode == base.CompDimsMode.SnakeCaseDesc:
             lhs = self.op.index[self.idx].display_name(True)
             templ_inputs = [
                     self.op.index[idx].display_name(True) for idx in
@@ -293,7 +341,7 @@ class DimsInput(GenFunc):
     def __init__(self, op, name):
         super().__init__(op, name)
         if name == base.LAYOUT:
-            self.gen_node = op._gen_node(Layout, base.LAYOUT)
+            self.gen_node = op.layout_gnode
         elif name == base.INDEX_RANKS:
             self.gen_node = None
         else:
@@ -315,11 +363,7 @@ class Layout(GenFunc):
         return self.wrapped_name('layout')
 
     def __call__(self):
-        num_layouts = self.op.data_formats.num_layouts()
-        for i, layout in enumerate(range(num_layouts)):
-            if i == self.op.max_yield_count:
-                break
-            yield layout
+        yield from range(min(self.op.num_layouts, self.op.max_yield_count))
 
 class Sig(GenFunc):
     """
@@ -351,6 +395,9 @@ class RankRange(GenFunc):
     def __init__(self, op, name):
         super().__init__(op, name)
         self.schema_cons = []
+        self.const_lo, self.const_hi = 0, 10000
+        # parent rank values => (lo, hi), see schema_bounds
+        self.bounds_cache = {}
 
     @property
     def graphviz_name(self):
@@ -360,18 +407,45 @@ class RankRange(GenFunc):
     def add_schema_constraint(self, cons):
         self.schema_cons.append(cons)
 
-    def __call__(self, **index_ranks):
-        # Get the initial bounds consistent with the schema
-        sch_lo, sch_hi = 0, 10000
+    def fold_constants(self):
+        """
+        Fold the schema constraints on this index alone into the constant
+        bounds.  Called once the schema is complete.
+        """
+        live_cons = []
         for cons in self.schema_cons:
-            clo, chi = cons(**index_ranks)
-            sch_lo = max(sch_lo, clo)
-            sch_hi = min(sch_hi, chi)
+            if cons.sig == self.sub_name:
+                clo, chi = cons()
+                self.const_lo = max(self.const_lo, clo)
+                self.const_hi = min(self.const_hi, chi)
+            else:
+                live_cons.append(cons)
+        self.schema_cons = live_cons
+        self.bounds_cache.clear()
 
-        for i, rank in enumerate(range(sch_lo, sch_hi+1)):
-            if i == self.op.max_yield_count:
-                break
-            yield rank
+    def schema_bounds(self, index_ranks):
+        """
+        Return the (lo, hi) rank bounds consistent with the schema, given the
+        ranks of the parent indices in {index_ranks}.  The parents are fixed,
+        so their ranks in order identify the bounds.
+        """
+        key = tuple(index_ranks.values())
+        bounds = self.bounds_cache.get(key, None)
+        if bounds is None:
+            sch_lo, sch_hi = self.const_lo, self.const_hi
+            for cons in self.schema_cons:
+                clo, chi = cons(**index_ranks)
+                sch_lo = max(sch_lo, clo)
+                sch_hi = min(sch_hi, chi)
+            bounds = sch_lo, sch_hi
+            self.bounds_cache[key] = bounds
+        return bounds
+
+    def __call__(self, **index_ranks):
+        # Get the initial bounds consistent with the schema
+        sch_lo, sch_hi = self.schema_bounds(index_ranks)
+        sch_hi = min(sch_hi, sch_lo + self.op.max_yield_count - 1)
+        yield from range(sch_lo, sch_hi+1)
 
 class RankEquiv(GenFunc):
     """
@@ -408,11 +482,7 @@ class ArgRanks(GenFunc):
         super().__init__(op)
 
     def __call__(self, index_ranks, sigs):
-        arg_ranks = {}
-        for arg, sig in sigs.items():
-            rank = sum(index_ranks[idx] for idx in sig)
-            arg_ranks[arg] = rank
-        yield arg_ranks
+        yield self.op._arg_ranks(index_ranks, sigs)
 
 class ArgIndels(GenFunc):
     """
@@ -466,10 +536,6 @@ class ArgMutations(GenFunc):
 
     def __call__(self, arg_indels, index_ranks, sigs, **comp):
         # yield negative dims version
-        arg_ranks = {}
-        for arg, sig in sigs.items():
-            arg_ranks[arg] = sum(index_ranks[idx] for idx in sig)
-
         for k, v in comp.items():
             if k == base.LAYOUT:
                 val = v
@@ -478,38 +544,14 @@ class ArgMutations(GenFunc):
             self.op.dims_graph_input[k] = val
 
         self.op.dims_graph_input[INDEX_RANKS] = index_ranks
-        all_nodes = set(self.op.dims_graph.values())
-        dims_kinds = (GenDims, CompDims)
-        dims_nodes = [n for n in all_nodes if isinstance(n.func, dims_kinds)]
+        all_nodes = self.op.dims_graph.values()
+        dims_nodes = self.op._dims_result_nodes()
 
         self.op.comp_dims_mode = base.CompDimsMode.Dims
         index_gen = fgraph.gen_graph_map(all_nodes, dims_nodes, full_name=False)
-        index_dims_list = []
-        for tup_map in index_gen:
-            dims_map = {}
-            for sig, tup in tup_map.items():
-                if len(sig) == 1:
-                    dims_map[sig] = tup
-                else:
-                    dims_map.update(dict(zip(sig, tup)))
-            index_dims_list.append(dims_map)
-
-        mut_arg_ranks = {}
-        for arg, sig in sigs.items():
-            mut_arg_ranks[arg] = arg_ranks[arg]
-            indel = arg_indels.get(arg, None)
-            if indel is not None:
-                kind, rest = indel[0], indel[1:]
-                if kind == Indel.Insert:
-                    _, size = rest
-                    mut_arg_ranks[arg] += size
-                elif kind == Indel.Delete:
-                    beg, end = rest
-                    size = end - beg
-                    mut_arg_ranks[arg] -= size
+        index_dims_list = [ base.ungroup_dims(tup_map) for tup_map in index_gen ]
 
         # incorporate the indel
-        # max_dimsize = get_max_dimsize(self.op.target_nelem, mut_arg_ranks)
         max_dimsize = 2 # very conservative, so that an insertion of 2 can only
         # increase memory by a factor of 4
         assert len(index_dims_list) > 0
@@ -547,15 +589,14 @@ class ArgMutations(GenFunc):
                     if isinstance(shape, int) or len(shape) == 0:
                         continue
                     i = self.op.gen_rng.choice(range(len(shape)))
-                    old_val = shape[i]
                     rang = range(1, max_mut_size)
                     new_val, alt_val = self.op.gen_rng.sample(rang, 2)
                     val = new_val if new_val != shape[i] else alt_val
-                    shape[i] = val
-                    mut_shape = { k: copy(v) for k, v in arg_shapes.items() }
-                    yield mut_shape
+                    # only arg is mutated, the other shapes are shared
+                    mut_arg = list(shape)
+                    mut_arg[i] = val
+                    yield { **arg_shapes, arg: mut_arg }
                     num_yielded += 1
-                    shape[i] = old_val
 
 class DataFormat(GenFunc):
     """
@@ -712,10 +753,13 @@ class ShapeTensor2D(NodeFunc):
         super().__init__(arg_name)
         self.arg_name = arg_name
         self.num_rows = num_rows
+        # the slice names match the interned sub_names of the slices' Sig
+        # nodes, which key arg_shapes
+        self.row_names = tuple(sys.intern(f'{arg_name}.{i}') for i in
+                range(num_rows))
 
     def __call__(self, arg_shapes):
-        names = [ f'{self.arg_name}.{i}' for i in range(self.num_rows) ]
-        rows = [ arg_shapes[n] for n in names ]
+        rows = [ arg_shapes[n] for n in self.row_names ]
         if len({ len(r) for r in rows }) != 1:
             # unequal length rows
             return
@@ -732,7 +776,7 @@ class RankInt(NodeFunc):
         self.sig = sig
 
     def __call__(self, index_ranks):
-        rank = sum(index_ranks[idx] for idx in self.sig)
+        rank = sum(map(index_ranks.__getitem__, self.sig))
         arg = oparg.IntArg(rank)
         yield arg
         
@@ -25,14 +25,15 @@ class ReportNodeFunc(NodeFunc):
 
     @contextmanager
     def reserve_edit(self, dist):
-        doit = (dist <= self.op.avail_edits)
+        op = self.op
+        doit = (dist <= op.avail_edits)
         if doit:
-            self.op.avail_edits -= dist
+            op.avail_edits -= dist
         try:
             yield doit
         finally:
             if doit:
-                self.op.avail_edits += dist
+                op.avail_edits += dist
 
 class ObservedValue(NodeFunc):
     """
@@ -55,9 +56,7 @@ class Layout(NodeFunc):
         return self.wrapped_name('layout')
 
     def __call__(self):
-        num_layouts = self.op.data_formats.num_layouts()
-        for i, layout in enumerate(range(num_layouts)):
-            yield layout
+        yield from range(self.op.num_layouts)
 
 class RankRange(ReportNodeFunc):
     """
@@ -69,6 +68,7 @@ class RankRange(ReportNodeFunc):
         self.schema_cons = []
         self.obs_shapes_cons = [] # constraint based on shapes
         self.obs_args_cons = []
+        self.const_lo, self.const_hi = 0, 100000
 
     @property
     def graphviz_name(self):
@@ -79,6 +79,21 @@ class RankRange(ReportNodeFunc):
         # these functions are called with **index_ranks
         self.schema_cons.append(cons)
 
+    def fold_constants(self):
+        """
+        Fold the schema constraints on this index alone into the constant
+        bounds.  Called once the schema is complete.
+        """
+        live_cons = []
+        for cons in self.schema_cons:
+            if cons.sig == self.sub_name:
+                clo, chi = cons()
+                self.const_lo = max(self.const_lo, clo)
+                self.const_hi = min(self.const_hi, chi)
+            else:
+                live_cons.append(cons)
+        self.schema_cons = live_cons
+
     def add_shapes_constraint(self, cons):
         """
         cons is created from API call rank_dims_constraint
@@ -101,7 +116,7 @@ class RankRange(ReportNodeFunc):
         index_ranks = kwargs
         
         # Get the initial bounds consistent with the schema
-        sch_lo, sch_hi = 0, 100000
+        sch_lo, sch_hi = self.const_lo, self.const_hi
         for cons in self.schema_cons:
             clo, chi = cons(**index_ranks)
             sch_lo = max(sch_lo, clo)
@@ -117,8 +132,7 @@ class RankRange(ReportNodeFunc):
             sch_lo = max(sch_lo, clo)
             sch_hi = min(sch_hi, chi)
 
-        for i in range(sch_lo, sch_hi+1):
-            yield i
+        yield from range(sch_lo, sch_hi+1)
 
 class RankEquiv(NodeFunc):
     """
@@ -158,10 +172,7 @@ class ArgIndels(ReportNodeFunc):
         super().__init__(op)
 
     def __call__(self, index_ranks, sigs, obs_shapes, layout):
-        arg_ranks = {}
-        for arg, sig in sigs.items():
-            rank = sum(index_ranks[idx] for idx in sig)
-            arg_ranks[arg] = rank
+        arg_ranks = self.op._arg_ranks(index_ranks, sigs)
         """
         Produces instructions to insert part of an index's dimensions, or
         delete a subrange from a shape.  
@@ -170,10 +181,9 @@ class ArgIndels(ReportNodeFunc):
         edit = base.ShapeEdit(self.op, index_ranks, sigs, layout)
 
         for arg, rank in arg_ranks.items():
-            if arg not in obs_shapes:
+            obs_shape = obs_shapes.get(arg, None)
+            if obs_shape is None:
                 continue
-            obs_shape = obs_shapes[arg]
-            sig = sigs[arg]
             if isinstance(obs_shape, int):
                 obs_rank = None
                 delta = 0 # rank-agnostic shape cannot have rank violation
@@ -209,22 +219,21 @@ class IndexUsage(ReportNodeFunc):
 
         usage_map = {} # idx => (dims => [arg1, ...]) 
         sigs = shape_edit.arg_sigs
+        arg_slices = self.op._arg_slices(index_ranks, sigs)
         for arg, obs_shape in obs_shapes.items():
-            sig = sigs[arg]
             if isinstance(obs_shape, int):
+                sig = sigs[arg]
                 assert len(sig) == 1, f'obs_shape was integer but sig was {sig}'
                 idx = sig[0]
                 usage = usage_map.setdefault(idx, {})
                 args = usage.setdefault(obs_shape, set())
                 args.add(arg)
             else:
-                off = 0
-                for idx in sig:
+                for idx, beg, end in arg_slices[arg]:
                     usage = usage_map.setdefault(idx, {})
-                    dims = tuple(obs_shape[off:off+index_ranks[idx]])
+                    dims = tuple(obs_shape[beg:end])
                     args = usage.setdefault(dims, set())
                     args.add(arg)
-                    off += index_ranks[idx]
         shape_edit.add_idx_usage(usage_map)
         with self.reserve_edit(shape_edit.cost()) as avail:
             if avail:
@@ -255,25 +264,29 @@ class IndexConstraints(ReportNodeFunc):
         comp_dims = self.render.get_dims(input_dims)
         shape_edit.add_comp_dims(comp_dims)
         
-        formulas = self.render.formula_map(input_dims)
         index_dims = { **input_dims, **comp_dims }
+        # the formulas take three more passes over the comp graph but are only
+        # needed for error reporting, so they are computed on the first failure
+        formulas = None # computed index => base.Formula
+        comp_pos = None # computed index => topological position
 
         for pred in self.index_preds:
             # skip any predicates if any input indices are missing - this can
             # happen when the predicate only applies to specific layouts
-            if not all(idx in index_dims for idx in pred.indices):
+            if not index_dims.keys() >= pred.index_set:
                 continue
             pred_input_dims = [ index_dims[idx] for idx in pred.indices ]
 
             if not pred(*pred_input_dims):
                 # collect the predecessor formulas
-                comp_nodes = self.op._comp_dims_nodes()
-                comp_names = [ n.sub_name for n in comp_nodes ]
-                en = enumerate(comp_names)
-                max_pos = max((p for p, i in en if i in pred.indices), default=-1)
-                source_formulas = []
-                for idx in comp_names[:max_pos+1]:
-                    source_formulas.append(formulas[idx])
+                if comp_pos is None:
+                    formulas = self.render.formula_map(input_dims)
+                    comp_names = self.op._comp_dims_names()
+                    comp_pos = { idx: p for p, idx in enumerate(comp_names) }
+                max_pos = max((comp_pos[idx] for idx in pred.indices 
+                    if idx in comp_pos), default=-1)
+                source_formulas = [ formulas[idx] for idx in
+                        comp_names[:max_pos+1] ]
                 shape_edit.add_constraint_error(pred, source_formulas)
 
         with self.reserve_edit(shape_edit.cost()) as avail:
@@ -288,10 +301,12 @@ class DataFormat(ReportNodeFunc):
     def __init__(self, op, formats, arg_name):
         super().__init__(op, arg_name)
         self.formats = formats
+        # (layout, rank, obs_fmt) => DataFormatEdit.  The edit depends on
+        # ranks only through the rank of formats.rank_index
+        self.edit_cache = {}
 
-    def __call__(self, ranks, layout, obs_args):
+    def _edit(self, ranks, layout, obs_fmt):
         imp_fmt = self.formats.data_format(layout, ranks)
-        obs_fmt = self.formats.observed_format(obs_args)
         if obs_fmt is None:
             # this will only occur if the schema permits None for data_format
             used_fmt = self.formats.default_format(ranks)
@@ -299,7 +314,22 @@ class DataFormat(ReportNodeFunc):
             used_fmt = obs_fmt
 
         arg_name = self.formats.arg_name
-        edit = base.DataFormatEdit(arg_name, obs_fmt, used_fmt, imp_fmt)
+        return base.DataFormatEdit(arg_name, obs_fmt, used_fmt, imp_fmt)
+
+    def __call__(self, ranks, layout, obs_args):
+        obs_fmt = self.formats.observed_format(obs_args)
+        rank_idx = self.formats.rank_index
+        rank = None if rank_idx is None else ranks[rank_idx]
+        try:
+            key = (layout, rank, obs_fmt)
+            edit = self.edit_cache.get(key, None)
+            if edit is None:
+                edit = self._edit(ranks, layout, obs_fmt)
+                self.edit_cache[key] = edit
+        except TypeError:
+            # unhashable data_format argument
+            edit = self._edit(ranks, layout, obs_fmt)
+
         with self.reserve_edit(edit.cost()) as avail:
             if avail:
                 yield edit
@@ -2,11 +2,16 @@
 Subclasses of OpArg - a class for representing arguments to the op, which are
 returned by certain nodes of gen_graph
 """
+import math
+from functools import lru_cache
 import numpy as np
 import tensorflow as tf
 from .error import SchemaError
 
 class OpArg(object):
+    # one is created per argument of every generated test
+    __slots__ = ()
+
     def __init__(self, *args):
         pass
 
@@ -22,13 +27,64 @@ class OpArg(object):
         """
         raise NotImplementedError
 
+    def key(self):
+        """
+        Return a tuple identifying the argument by type and content.  Unlike
+        repr, values of different types never share a key.  May contain lists,
+        see base.freeze
+        """
+        raise NotImplementedError
+
+# tensors with more elements than this are not cached.  With the maxsize of
+# _cached_random_tensor, this bounds the cache to about 100MB
+_MAX_CACHED_NELEM = int(1e5)
+
+def _random_tensor(shape, dtype):
+    """
+    Generate a random tensor of {shape} and {dtype}
+    """
+    if dtype.is_integer:
+        lo = max(dtype.min, -1000)
+        hi = min(dtype.max, 1000) 
+        ten = tf.random.uniform(shape, lo, hi, dtype=tf.int64)
+        ten = tf.cast(ten, dtype)
+    elif dtype.is_floating:
+        lo = max(dtype.min, -1.0)
+        hi = min(dtype.max, 1.0)
+        ten = tf.random.uniform(shape, lo, hi, dtype=tf.float64)
+        ten = tf.cast(ten, dtype)
+    elif dtype.is_bool:
+        ten = tf.random.uniform(shape, 0, 2, dtype=tf.int32)
+        ten = tf.cast(ten, dtype)
+    elif dtype.is_quantized:
+        lo, hi = -1000, 1000
+        ten = tf.random.uniform(shape, lo, hi, dtype=tf.float32)
+        quant = tf.quantization.quantize(ten, lo, hi, dtype)
+        ten = quant.output
+    elif dtype.is_complex:
+        lo, hi = -1.0, 1.0
+        real = tf.random.uniform(shape, lo, hi, dtype=tf.float64)
+        imag = tf.random.uniform(shape, lo, hi, dtype=tf.float64)
+        ten = tf.complex(real, imag, dtype)
+    else:
+        raise SchemaError(
+            f'Unexpected dtype when generating tensor: dtype=\'{dtype.name}\'')
+    return ten
+
+# Tensors are immutable, so tests which request the same shape and dtype share
+# one tensor.  OpSchema.validate clears this at the start and end of each run
+_cached_random_tensor = lru_cache(maxsize=64)(_random_tensor)
+
 class DataTensorArg(OpArg):
     """
     An OpArg produced by ge.DataTensor 
     """
+    __slots__ = ('shape', 'dtype')
+
     def __init__(self, shape, dtype_name):
         super().__init__()
-        nelem = np.prod(shape)
+        # shapes are short int lists, or an int for a broadcast shape
+        nelem = shape if isinstance(shape, int) else math.prod(shape)
         if nelem > int(1e8):
             raise SchemaError(f'Shape \'{shape}\' has {nelem} elements, '
                     f'which exceeds 1e8 elements')
@@ -41,9 +97,18 @@ class DataTensorArg(OpArg):
     def __str__(self):
         return f'{self.shape}:{self.dtype.name}'
 
+    def key(self):
+        return type(self), self.shape, self.dtype.name
+
     def value(self):
         try:
-            return self._value()
+            shape = self.shape
+            if isinstance(shape, list):
+                shape = tuple(shape)
+            nelem = shape if isinstance(shape, int) else math.prod(shape)
+            if nelem > _MAX_CACHED_NELEM:
+                return _random_tensor(shape, self.dtype)
+            return _cached_random_tensor(shape, self.dtype)
         except BaseException as ex:
             raise SchemaError(
                 f'{type(self).__qualname__}: Couldn\'t create value for '
@@ -51,45 +116,21 @@ class DataTensorArg(OpArg):
                 f'\'{self.dtype.name}\'.  Got exception: '
                 f'{ex}')
 
-    def _value(self):
-        if self.dtype.is_integer:
-            lo = max(self.dtype.min, -1000)
-            hi = min(self.dtype.max, 1000) 
-            ten = tf.random.uniform(self.shape, lo, hi, dtype=tf.int64)
-            ten = tf.cast(ten, self.dtype)
-        elif self.dtype.is_floating:
-            lo = max(self.dtype.min, -1.0)
-            hi = min(self.dtype.max, 1.0)
-            ten = tf.random.uniform(self.shape, lo, hi, dtype=tf.float64)
-            ten = tf.cast(ten, self.dtype)
-        elif self.dtype.is_bool:
-            ten = tf.random.uniform(self.shape, 0, 2, dtype=tf.int32)
-            ten = tf.cast(ten, self.dtype)
-        elif self.dtype.is_quantized:
-            lo, hi = -1000, 1000
-            ten = tf.random.uniform(self.shape, lo, hi, dtype=tf.float32)
-            quant = tf.quantization.quantize(ten, lo, hi, self.dtype)
-            ten = quant.output
-        elif self.dtype.is_complex:
-            lo, hi = -1.0, 1.0
-            real = tf.random.uniform(self.shape, lo, hi, dtype=tf.float64)
-            imag = tf.random.uniform(self.shape, lo, hi, dtype=tf.float64)
-            ten = tf.complex(real, imag, self.dtype)
-        else:
-            raise SchemaError(
-                f'Unexpected dtype when generating tensor: dtype=\'{self.dtype.name}\'')
-        return ten
-
 class ShapeTensorArg(OpArg):
     """
     An OpArg produced by ge.ShapeTensor
     """
+    __slots__ = ('shape',)
+
     def __init__(self, shape):
         super().__init__()
         self.shape = shape
 
     def value(self):
         return tf.constant(self.shape, dtype=tf.int32)
+
+    def key(self):
+        return type(self), self.shape
     
     def __repr__(self):
         return f'{self.__class__.__name__}({self.shape})'
@@ -101,6 +142,8 @@ class ShapeListArg(OpArg):
     """
     An OpArg produced by ge.ShapeList
     """
+    __slots__ = ('shape',)
+
     def __init__(self, shape):
         super().__init__()
         self.shape = shape
@@ -114,10 +157,15 @@ class ShapeListArg(OpArg):
     def value(self):
         return self.shape
 
+    def key(self):
+        return type(self), self.shape
+
 class ShapeTensor2DArg(OpArg):
     """
     An OpArg produced by ge.ShapeTensor2D
     """
+    __slots__ = ('content',)
+
     def __init__(self, shape2d):
         self.content = shape2d
 
@@ -134,10 +182,15 @@ class ShapeTensor2DArg(OpArg):
         ten = tf.transpose(ten)
         return ten
 
+    def key(self):
+        return type(self), self.content
+
 class IntArg(OpArg):
     """
     An OpArg produced by ge.ShapeInt
     """
+    __slots__ = ('val',)
+
     def __init__(self, val):
         self.val = val
 
@@ -150,10 +203,15 @@ class IntArg(OpArg):
     def value(self):
         return self.val
 
+    def key(self):
+        return type(self), type(self.val), self.val
+
 class ValueArg(OpArg):
     """
     An OpArg holding an arbitrary value
     """
+    __slots__ = ('val',)
+
     def __init__(self, val):
         self.val = val
 
@@ -166,3 +224,6 @@ class ValueArg(OpArg):
     def value(self):
         return self.val
 
+    def key(self):
+        return type(self), type(self.val), self.val
+
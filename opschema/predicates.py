@@ -21,6 +21,22 @@ in cost-increasing order.  An empty list signifies that the predicate could not
 find any suggestions which would fix the framework op inputs.
 """
 
+def static_value(ten):
+    """
+    Return the contents of {ten} as a numpy array without running the graph.
+    For eager tensors this is the tensor value.  Symbolic tensors are
+    constant-folded where possible, but are never forced to evaluate.
+    Elements whose value is unknown are None, in the same way as unknown
+    dimensions of a symbolic tensor's shape.  Returns None only if the shape
+    of {ten} is not static.
+    """
+    vals = tf.get_static_value(ten, partial=True)
+    if vals is not None:
+        return vals
+    if not ten.shape.is_fully_defined():
+        return None
+    return np.full(ten.shape.as_list(), None, dtype=object)
+
 class ErrorReport(object):
     def __init__(self, func, *info):
         self.func = func
@@ -95,9 +111,11 @@ class ValidReturnShapes(ReportNodeFunc):
         return msg
 
     def __call__(self, op, tensors):
+        # op.return_tensors holds the 'return[i]' names in order
+        ret_names = op.return_tensors
         for ridx, tensor in enumerate(tensors):
             actual_shape = tensor.shape.as_list()
-            ret_name = f'return[{ridx}]'
+            ret_name = ret_names[ridx]
             pred_shape = op.inf_result.get_arg_shape(ret_name)
             if actual_shape == pred_shape:
                 return True, None
@@ -140,20 +158,19 @@ class ShapeList(ReportNodeFunc):
 
     def __call__(self, op):
         shape = op._get_arg(self.arg_name)
-        err = ErrorReport(self, shape)
 
         if isinstance(shape, int) and self.broadcast_mode:
             if shape >= 0:
                 return True, shape
             else:
-                return False, err
+                return False, ErrorReport(self, shape)
 
         if not isinstance(shape, list):
-            return False, err
+            return False, ErrorReport(self, shape)
         if not all(isinstance(v, int) for v in shape):
-            return False, err
+            return False, ErrorReport(self, shape)
         if not all(v >= 0 for v in shape):
-            return False, err
+            return False, ErrorReport(self, shape)
         else:
             # In broadcast mode, return an integer rather than integer list.
             if self.broadcast_mode and len(shape) == 1:
@@ -234,20 +251,29 @@ class ShapeTensorFunc(ReportNodeFunc):
         elif received_val.dtype != tf.int32:
             msg += 'Received dtype = {received_val.dtype.name}.'
         else:
-            nums = received_val.numpy().tolist()
-            if not all(self.ranged.valid(n) for n in nums):
+            vals = static_value(received_val)
+            if vals is None:
+                msg += 'Tensor shape could not be determined statically.'
+            elif not all(n is None or self.ranged.valid(n)
+                    for n in vals.tolist()):
                 msg += f'Elements must be {self.ranged.predicate_msg()}'
         return msg
 
     def __call__(self, op, *shapes):
         ten = op._get_arg(self.arg_name)
-        err = ErrorReport(self, ten)
         if not isinstance(ten, tf.Tensor) or ten.dtype != tf.int32:
-            return False, err 
+            return False, ErrorReport(self, ten)
+        vals = static_value(ten)
+        if vals is None:
+            return False, ErrorReport(self, ten)
         else:
-            nums = ten.numpy().tolist()
-            if not all(self.ranged.valid(n) for n in nums):
-                return False, err 
+            nums = vals.tolist()
+            # elements with unknown values are not checked
+            if not all(n is None or self.ranged.valid(n) for n in nums):
+                return False, ErrorReport(self, ten)
+            elif None in nums:
+                # pred_func expects integers, so its check is deferred
+                return True, nums
             else:
                 try:
                     return self.func(nums, *shapes)
@@ -288,28 +314,33 @@ class ShapeTensor2D(ReportNodeFunc):
         elif ten.shape[1] != self.num_slices:
             msg += f'Tensor shape[1] was \'{ten.shape[1]}\'. '
         else:
-            rows = ten.numpy()
+            rows = static_value(ten)
+            if rows is None:
+                msg += 'Tensor shape could not be determined statically.'
+                return msg
             for row in rows:
-                if any(el < 0 for el in row):
+                if any(el is not None and el < 0 for el in row):
                     msg += f'One or more elements were negative.'
         return msg
 
     def __call__(self, op):
         ten = op._get_arg(self.arg_name) 
-        err = ErrorReport(self, ten)
         if not isinstance(ten, tf.Tensor):
-            return False, err
+            return False, ErrorReport(self, ten)
         elif not ten.dtype.is_integer:
-            return False, err
+            return False, ErrorReport(self, ten)
         elif ten.shape.rank != 2:
-            return False, err
+            return False, ErrorReport(self, ten)
         elif ten.shape[1] != self.num_slices:
-            return False, err
+            return False, ErrorReport(self, ten)
+        vals = static_value(ten)
+        if vals is None:
+            return False, ErrorReport(self, ten)
         else:
-            vals = tf.transpose(ten).numpy()
+            vals = vals.transpose()
             for row in vals:
-                if any(el < 0 for el in row):
-                    return False, err
+                if any(el is not None and el < 0 for el in row):
+                    return False, ErrorReport(self, ten)
             tup = tuple(vals.tolist())
             return True, tup
 
@@ -379,6 +410,9 @@ class Inventory(NodeFunc):
     def __init__(self, op):
         super().__init__()
         self.op = op
+        # (avail_edits, dtypes, obs_shapes, args) => result of __call__
+        self.cache = {}
+        self.max_cache_size = 10000
 
     def __call__(self, dtypes, obs_shapes, args):
         """
@@ -387,8 +421,26 @@ class Inventory(NodeFunc):
             If successful, returns [Fix], which is a zero-cost "fix".
             If failed, returns the empty list
         Assume that self.op.avail_edits is set appropriately.
+
+        The inference graph is a pure function of the observations and
+        avail_edits, so results are cached on those.
         """
         self.op._prep_inference(dtypes, obs_shapes, args)
+        try:
+            key = (self.op.avail_edits, base.freeze(dtypes),
+                    base.freeze(obs_shapes), base.freeze(args))
+        except TypeError:
+            return self.infer(obs_shapes)
+
+        result = self.cache.get(key, None)
+        if result is None:
+            result = self.infer(obs_shapes)
+            if len(self.cache) == self.max_cache_size:
+                self.cache.clear()
+            self.cache[key] = result
+        return result
+
+    def infer(self, obs_shapes):
         fixes = []
 
         all_nodes = set(self.op.inf_graph.values())
@@ -435,7 +487,7 @@ class DataFormat(ReportNodeFunc):
             return True, self.formats.single()
 
         data_format = op._get_arg(self.arg_name)
-        valid = (data_format in self.formats.all_formats())
+        valid = self.formats.valid_format(data_format)
         if valid:
             return True, data_format
         else:
@@ -462,11 +514,10 @@ class ArgInt(ReportNodeFunc):
 
     def __call__(self, op):
         arg_val = op._get_arg(self.arg_name) 
-        err = ErrorReport(self, arg_val)
         if not isinstance(arg_val, int):
-            return False, err
+            return False, ErrorReport(self, arg_val)
         elif arg_val not in range(self.lo, self.hi + 1):
-            return False, err
+            return False, ErrorReport(self, arg_val)
         else:
             return True, arg_val
 
@@ -493,6 +544,10 @@ class Options(ReportNodeFunc):
                 f'{type(self).__qualname__}: \'options\' argument must be '
                 f'iterable.  Got {type(options)}')
         self.options = options
+        try:
+            self.option_set = frozenset(options)
+        except TypeError:
+            self.option_set = None # some option is unhashable
 
     def user_msg(self, received_val):
         msg =  f'Argument \'{self.arg_name}\' must be one of '
@@ -502,7 +557,12 @@ class Options(ReportNodeFunc):
 
     def __call__(self, op):
         arg_val = op._get_arg(self.arg_name)
-        if arg_val in self.options:
+        try:
+            found = arg_val in self.option_set
+        except TypeError:
+            # no option_set, or arg_val is unhashable
+            found = arg_val in self.options
+        if found:
             return True, arg_val
         else:
             return False, ErrorReport(self, arg_val)
@@ -9,32 +9,32 @@ import tempfile
 libc = ctypes.CDLL(None)
 c_stderr = ctypes.c_void_p.in_dll(libc, 'stderr')
 
+def _redirect_stderr(to_fd, original_stderr_fd):
+    """Redirect stderr to the given file descriptor."""
+    # Flush the C-level buffer stderr
+    libc.fflush(c_stderr)
+    # Flush and close sys.stderr - also closes the file descriptor (fd)
+    sys.stderr.close()
+    # Make original_stderr_fd point to the same file as to_fd
+    os.dup2(to_fd, original_stderr_fd)
+    # Create a new sys.stderr that points to the redirected fd
+    sys.stderr = io.TextIOWrapper(os.fdopen(original_stderr_fd, 'wb'))
+
 @contextmanager
 def stderr_redirector(stream):
     # The original fd stderr points to. Usually 1 on POSIX systems.
     original_stderr_fd = sys.stderr.fileno()
 
-    def _redirect_stderr(to_fd):
-        """Redirect stderr to the given file descriptor."""
-        # Flush the C-level buffer stderr
-        libc.fflush(c_stderr)
-        # Flush and close sys.stderr - also closes the file descriptor (fd)
-        sys.stderr.close()
-        # Make original_stderr_fd point to the same file as to_fd
-        os.dup2(to_fd, original_stderr_fd)
-        # Create a new sys.stderr that points to the redirected fd
-        sys.stderr = io.TextIOWrapper(os.fdopen(original_stderr_fd, 'wb'))
-
     # Save a copy of the original stderr fd in saved_stderr_fd
     saved_stderr_fd = os.dup(original_stderr_fd)
     try:
         # Create a temporary file and redirect stderr to it
         tfile = tempfile.TemporaryFile(mode='w+b')
-        _redirect_stderr(tfile.fileno())
+        _redirect_stderr(tfile.fileno(), original_stderr_fd)
         # Yield to caller (this may raise)
         yield
     finally:
-        _redirect_stderr(saved_stderr_fd)
+        _redirect_stderr(saved_stderr_fd, original_stderr_fd)
         # Copy contents of temporary file to the given stream
         tfile.flush()
         tfile.seek(0, io.SEEK_SET)
@@ -42,3 +42,33 @@ def stderr_redirector(stream):
         tfile.close()
         os.close(saved_stderr_fd)
 
+@contextmanager
+def stderr_capture():
+    """
+    Like stderr_redirector, but redirects stderr once for the whole context.
+    Yields a function which returns everything written to stderr since its
+    last call, and empties the capture file.  Use this instead of entering
+    stderr_redirector repeatedly in a loop.
+    """
+    original_stderr_fd = sys.stderr.fileno()
+    saved_stderr_fd = os.dup(original_stderr_fd)
+    tfile = tempfile.TemporaryFile(mode='w+b')
+
+    def drain():
+        libc.fflush(c_stderr)
+        sys.stderr.flush()
+        # tfile shares its file offset with the redirected stderr fd
+        tfile.seek(0, io.SEEK_SET)
+        content = tfile.read()
+        tfile.seek(0, io.SEEK_SET)
+        tfile.truncate()
+        return content
+
+    try:
+        _redirect_stderr(tfile.fileno(), original_stderr_fd)
+        yield drain
+    finally:
+        _redirect_stderr(saved_stderr_fd, original_stderr_fd)
+        tfile.close()
+        os.close(saved_stderr_fd)
+
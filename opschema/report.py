@@ -1,4 +1,3 @@
-import numpy as np
 from . import base
 from .base import ReportKind
 """
@@ -25,6 +24,12 @@ Just put two arrows.
 
 """
 
+# (delta < 0) => template of the tip for an arg rank edit, see _template_table
+_INDEL_TIPS = {
+        True: 'remove {n} dimension{sfx} from {arg}',
+        False: 'add {n} dimension{sfx} to {arg}'
+        }
+
 class Report(object):
     def __init__(self, op, fixes, obs_dtypes, obs_shapes, obs_args):
         self.op = op
@@ -121,8 +126,8 @@ class Report(object):
         index_ranks = shape_edit.index_ranks 
         layout = shape_edit.layout
 
-        leader_column = ['received', 'template', 'error']
-        columns = [leader_column]
+        # built row-major: one row each for received, template and error
+        body = [ ['received'], ['template'], ['error'] ]
         for arg in column_names:
             if arg == df_name:
                 used_fmt = fix.df.used
@@ -149,21 +154,18 @@ class Report(object):
                 # shape_str = dims_string(obs_shape)
                 obs_repr = ['?' if d is None else str(d) for d in obs_shape]
                 col = [ obs_repr, arg_templ[arg] ]
-                hl_row = []
-                for idx in sig:
-                    do_hl = shape_edit.highlighted(arg, idx)
-                    hl = [do_hl] * index_ranks[idx]
-                    hl_row.extend(hl)
+                hl_row = [ hl for idx in sig for hl in
+                        [shape_edit.highlighted(arg, idx)] * index_ranks[idx] ]
                 widths = [max(len(str(t)), len(str(s))) for s, t in zip(*col)]
                 hl_row_str = ['^' * w if h else '' for h, w in zip(hl_row,
                     widths)]
                 col.append(hl_row_str)
                 col_str, _ = base.tabulate(col, ' ', False)
 
-            # add the header
-            columns.append(col_str)
+            for row, cell in zip(body, col_str):
+                row.append(cell)
 
-        rows = [header_row] + np.array(columns).transpose().tolist()
+        rows = [header_row] + body
         main, _ = base.tabulate(rows, '   ', False)
         codestring = base.FixKind.codestring(fix.code())
         table = '\n'.join([codestring] + main)
@@ -256,11 +258,10 @@ class Report(object):
                     if col in edit.arg_delta:
                         delta = edit.arg_delta[col]
                         cell = '=> ' + cell
-                        sfx = '' if abs(delta) == 1 else 's'
-                        if delta < 0:
-                            tip = f'remove {abs(delta)} dimension{sfx} from {col}'
-                        else:
-                            tip = f'add {delta} dimension{sfx} to {col}'
+                        n = abs(delta)
+                        sfx = '' if n == 1 else 's'
+                        tip = _INDEL_TIPS[delta < 0].format(n=n, sfx=sfx,
+                                arg=col)
                         edit_tips.append(tip)
                 row.append(cell)
 
@@ -315,7 +316,14 @@ def index_definitions(op):
     return tab 
 
 def _get_shape_columns(op, obs_shapes):
-    s = set(obs_shapes.keys()) 
+    # the columns depend only on which shapes were observed, which is the
+    # same for nearly every call of an op.  callers must not modify them
+    key = tuple(obs_shapes.keys())
+    columns = op.shape_columns_cache.get(key, None)
+    if columns is not None:
+        return columns
+
+    s = set(key) 
     # s = { arg for arg, shp in obs_shapes.items() if isinstance(shp, list) }
 
     df_name = op.data_formats.arg_name
@@ -324,9 +332,8 @@ def _get_shape_columns(op, obs_shapes):
     columns = [ arg for arg in op.arg_order if arg in s ]
 
     # append output columns
-    for i in range(op.num_returns):
-        columns.append(f'return[{i}]')
-
+    columns.extend(op.return_tensors)
+    op.shape_columns_cache[key] = columns
     return columns 
 
 def _get_headers(op, columns):
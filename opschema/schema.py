@@ -1,10 +1,15 @@
 import tensorflow as tf
 import traceback
 import inspect
-from collections import OrderedDict
 import sys, io, os
 import re
 import itertools
+import functools
+import operator
+import multiprocessing
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
 from random import Random
 from . import genlib
 from . import predicates as pr
@@ -13,13 +18,68 @@ from . import infer as nf
 from . import report
 from . import base
 from . import fgraph
+from . import oparg
 from .oparg import OpArg
-from .redirect import stderr_redirector
+from .redirect import stderr_redirector, stderr_capture
 from .error import *
 from .fgraph import PredNode as P, GenNode as G, FuncNode as F
-from .base import ShapeKind
 from .procfuncs import proc_wrap
 
+# strips the '{{...}} ' node prefix from TensorFlow exception messages
+_FRAMEWORK_MSG_RE = re.compile(r'\{\{.+?\}\} (.+)')
+
+# (opschema found no error, framework raised no exception) => test category
+_TEST_CATEGORY = {
+        (True, True): 'TN',
+        (True, False): 'FN',
+        (False, True): 'FP',
+        (False, False): 'TP'
+        }
+
+# the OpSchema instance used by a worker process of OpSchema.validate
+_worker_op = None
+
+def _init_validate_worker(op_path):
+    global _worker_op
+    # the workers already occupy the cores, so each runs TF single-threaded.
+    # This only takes effect before the TF runtime is initialized, so it
+    # precedes init_op.  The runtime may already be up if the spawned process
+    # re-imported a main module which runs TF ops at import time.
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(1)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError as ex:
+        print(f'validate worker: could not limit TF threads: {ex}',
+                file=sys.stderr)
+    from . import init_op
+    _worker_op = init_op(op_path)
+    _worker_op._wrapped()
+
+def _validate_worker(tests, show_traceback):
+    # redirect stderr once for the batch rather than once per test
+    with stderr_capture() as drain_err:
+        return [ _worker_op._run_test(*test, show_traceback, drain_err)
+                for test in tests ]
+
+def _stream_results(pool, tests, show_traceback, batch_size, max_pending):
+    """
+    Run {tests} on {pool} in batches of {batch_size}, yielding results in
+    test order.  At most {max_pending} batches are outstanding at once, so
+    tests are generated only as fast as the workers consume them.
+    """
+    batches = iter(lambda: list(itertools.islice(tests, batch_size)), [])
+    pending = deque()
+    try:
+        for batch in batches:
+            pending.append(pool.submit(_validate_worker, batch, show_traceback))
+            if len(pending) == max_pending:
+                yield from pending.popleft().result()
+        while len(pending) > 0:
+            yield from pending.popleft().result()
+    finally:
+        # on error or early close, don't leave queued batches running
+        for future in pending:
+            future.cancel()
 
 """
 Every API call will mutate the Generative Graph and the Predicate Graph
@@ -44,6 +104,9 @@ class Index(object):
     pri_idx is the index whose rank this one is equated to.  Or, if pri_idx ==
     idx, it means the instance itself is a primary index
     """
+    __slots__ = ('idx', 'desc', 'pri_idx', 'rank_range', 'has_insig',
+            'dims_node_cls')
+
     def __init__(self, idx, desc, pri_idx, rank_range):
         self.idx = idx
         self.desc = desc
@@ -77,17 +140,6 @@ class Index(object):
     def snake(self):
         return base.snake_case(self.desc)
 
-class Partial(object):
-    """
-    Curry extra_args at the end
-    """
-    def __init__(self, func, *extra_args):
-        self.func = func
-        self.extra_args = extra_args
-
-    def __call__(self, *args):
-        return self.func(*args, *self.extra_args)
-
 class OpSchema(object):
     def __init__(self, op_path):
         self.op_path = op_path
@@ -111,6 +163,7 @@ class OpSchema(object):
 
         # params is used to retrieve values during testing
         self.arg_order = None
+        self.arg_index = None # arg_name => position in arg_order
         self.arg_gen_nodes = {} # arg_name => GenNode
         self.args_gnode = None
 
@@ -120,6 +173,15 @@ class OpSchema(object):
         self.inf_graph = {}
         self.dims_graph = {}
 
+        # idx => the GenDims or CompDims node of dims_graph which holds idx
+        self.dims_index_nodes = {}
+
+        # (size of dims_graph, node lists by kind), see _dims_node_lists
+        self.dims_node_lists = None
+
+        # (size of dims_graph, computed index names), see _comp_dims_names
+        self.comp_dims_names = None
+
         # Random Number Generators
         self.gen_rng = Random()
 
@@ -138,28 +200,64 @@ class OpSchema(object):
         self.dtypes = None 
         self.predicate_nodes = None
         self.data_format_inode = None
+        self.data_format_gnode = None
 
         # Objects shared between graphs
         self.data_formats = None
+        self.num_layouts = 1 # arg_layout is implicitly 1 until called
         
         self.data_tensors = []
-        self.shape_args = []
         self.dtype_rules = base.DTypeRules()
         self.index_preds = []
         self.num_returns = 0
         self.return_nodes = []
         self.return_tensors = []
-        self.sum_range_constraints = []
+
+        # data tensors and return tensors, named with a '.shape' suffix
+        self.tensor_names = set()
+        # (pri_sig, lo, hi) => SumRangeConstraint, see limit_ranks
+        self.sum_range_constraints = {}
 
         # None: success.  pr.ErrorReport or list of Fix objects is failure
         self.op_error = None  # None means success.
         self.framework_exc_msg = None
-        self.framework_tblines = None
+        # traceback of the framework exception, formatted only if reported
+        self.framework_tb = None
 
         # call time values
         self.arguments = {}
         self.returns = [] 
 
+        # (index_ranks, sigs) => arg_ranks, see _arg_ranks 
+        self.arg_ranks_cache = {}
+
+        # (index_ranks, sigs) => arg_slices, see _arg_slices
+        self.arg_slices_cache = {}
+
+        # func => LRU-cached func, see ge.CompDims.memo_func
+        self.comp_dims_memo = {}
+
+        # observed shape keys => report columns, see report._get_shape_columns
+        self.shape_columns_cache = {}
+
+        # op_args keys => ordered keys, see _test_arg_keys
+        self.test_arg_keys = {}
+
+        # ranks tuple => comma-separated string, see base.Fix.summary
+        self.rank_str_cache = {}
+
+        # sigs tuple => the same tuple, shared by all args that use it
+        self.sigs_lists = {}
+
+        # signatures already validated against the index, see _check_sig
+        self.checked_sigs = set()
+
+        # arg or return name => sort position, see _shape_key_order
+        self.shape_key_pos = None
+
+        # include_inventory => report, see explain
+        self.explain_cache = {}
+
     def _pred_node(self, pred_class, name=None):
         name = fgraph.node_name(pred_class, name)
         return self.pred_graph.get(name, None)
@@ -179,13 +277,50 @@ class OpSchema(object):
         name = fgraph.node_name(dims_class, name)
         return self.dims_graph.get(name, None)
 
+    def _arg_ranks(self, index_ranks, sigs):
+        """
+        Return the map of arg => rank induced by {index_ranks} and {sigs}.
+        The number of distinct rank settings an op sees is small, so the
+        result is computed once per setting and shared.  Callers must not
+        modify the returned map.
+        """
+        key = (tuple(index_ranks.items()), tuple(sigs.items()))
+        arg_ranks = self.arg_ranks_cache.get(key, None)
+        if arg_ranks is None:
+            arg_ranks = {}
+            for arg, sig in sigs.items():
+                arg_ranks[arg] = sum(map(index_ranks.__getitem__, sig))
+            self.arg_ranks_cache[key] = arg_ranks
+        return arg_ranks
+
+    def _arg_slices(self, index_ranks, sigs):
+        """
+        Return the map of arg => ((idx, beg, end), ...), giving the slice of
+        the arg's shape taken up by each index in its signature, as induced by
+        {index_ranks} and {sigs}.  Cached like _arg_ranks.  Callers must not
+        modify the returned map.
+        """
+        key = (tuple(index_ranks.items()), tuple(sigs.items()))
+        arg_slices = self.arg_slices_cache.get(key, None)
+        if arg_slices is None:
+            arg_slices = {}
+            for arg, sig in sigs.items():
+                slices = []
+                off = 0
+                for idx in sig:
+                    end = off + index_ranks[idx]
+                    slices.append((idx, off, end))
+                    off = end
+                arg_slices[arg] = tuple(slices)
+            self.arg_slices_cache[key] = arg_slices
+        return arg_slices
+
     def _init(self, init_schema_func):
-        # edges to create for the pred graph
         self.framework_op = eval(self.op_path)
         self.func_sig = inspect.signature(self.framework_op)
-        self.arg_order = list(self.func_sig.parameters.keys())
-        self.pending_pred_edges = {} # node name -> [parent node name, ...]
-        self.pending_index_edges = {} # node name -> [idx, idx, ...]
+        # the framework op's signature is fixed, so both are frozen here
+        self.arg_order = tuple(self.func_sig.parameters)
+        self.arg_index = { arg: pos for pos, arg in enumerate(self.arg_order) }
         self._init_pred_graph()
         self._init_inf_graph()
         self._init_gen_graph()
@@ -213,17 +348,19 @@ class OpSchema(object):
                 return ret_val
             except BaseException as ex:
                 exc_str = str(ex)
-                mt = re.match('\{\{.+?\}\} (.+)', exc_str)
+                mt = _FRAMEWORK_MSG_RE.match(exc_str)
                 if mt is None:
                     self.framework_exc_msg = exc_str 
                 else:
                     self.framework_exc_msg = mt.groups()[0]
-                self.framework_tblines = traceback.format_tb(ex.__traceback__)
+                self.framework_tb = ex.__traceback__
                 raise ex
             finally:
-                msg = self._report()
-                if msg is not None:
-                    print(msg, file=sys.stderr)
+                # most calls pass, and produce no report
+                if self.op_error is not None:
+                    msg = self._report()
+                    if msg is not None:
+                        print(msg, file=sys.stderr)
 
         self.wrapped_op = wrapped_op
         return wrapped_op
@@ -246,14 +383,14 @@ class OpSchema(object):
         self.arguments = bind.arguments
         self.returns.clear()
         self.framework_exc_msg = None
-        self.framework_tblines = []
+        self.framework_tb = None
         self.inf_result = None
 
         for dist in range(self.max_search_dist+1):
             self.avail_edits = dist
             # returns the value of the first failing predicate node, or
             # none if all succeed
-            ret = fgraph.pred_graph_evaluate(*self.predicate_nodes)
+            ret = fgraph.pred_graph_evaluate_sorted(self.predicate_nodes)
             if isinstance(ret, pr.ErrorReport):
                 # error occurred in one of the single-argument handling nodes
                 return ret
@@ -284,23 +421,17 @@ class OpSchema(object):
         if self.op_error is not None:
             return
 
-        if not isinstance(op_return, (list, tuple)):
-            op_return = (op_return,)
-
-        self.returns = list(op_return)
-        error = fgraph.pred_graph_evaluate(*self.return_nodes)
+        if isinstance(op_return, (list, tuple)):
+            self.returns = list(op_return)
+        else:
+            self.returns = [op_return]
+        error = fgraph.pred_graph_evaluate_sorted(self.return_nodes)
         self.op_error = error
 
     def _shape_key_order(self, shape_keys):
-        def key_fun(shape_key):
-            pfx = shape_key.split('.')[0]
-            if pfx in self.arg_order:
-                return self.arg_order.index(pfx)
-            else:
-                m = re.match('return\[(\d+)\]', shape_key)
-                ind = int(m.group(1))
-                return len(self.arg_order) + ind
-
+        # shape keys are arg names, possibly with a '.k' suffix, or returns
+        key_pos = self.shape_key_pos
+        key_fun = lambda shape_key: key_pos[shape_key.split('.', 1)[0]]
         key_order = sorted(shape_keys, key=key_fun)
         return key_order
 
@@ -311,51 +442,63 @@ class OpSchema(object):
         Generate a usage inventory for the op.  Includes all combinations of
         input signatures, data format, dtypes
         """
-        ranks_node = self._gen_node(ge.IndexRanks)
-        sigs_node = self._gen_node(ge.SigMap)
+        ranks_node = self.ranks_gnode
+        sigs_node = self.sigmap_gnode
         dtypes_node = self.dtypes_gfilt
-        df_arg = self.data_formats.arg_name # may be None
-        data_format_node = self._gen_node(ge.DataFormat, df_arg)
+        data_format_node = self.data_format_gnode
         out_nodes = (ranks_node, sigs_node, dtypes_node, data_format_node)
         live_nodes = self.gen_graph.values()
         gen = fgraph.gen_graph_values(live_nodes, out_nodes)
 
-        inventory = list(gen)
+        # stream the configurations, peeking at the first for the header
+        first = next(gen)
+        inventory = itertools.chain([first], gen)
 
         # includes args and returns.  args may have a '.k' suffix
-        all_sigs = inventory[0][1]
+        all_sigs = first[1]
         shape_args = [ *all_sigs ]
         if self.data_formats.arg_name is not None:
             shape_args.append(self.data_formats.arg_name)
         arg_order = self._shape_key_order(shape_args)
 
-        header = []
+        # arg => gen_graph NodeFunc, or None for returns
+        arg_funcs = {}
         for arg in arg_order:
-            header.append(self._arg_shape_name(arg))
             node = self.arg_gen_nodes.get(arg, None)
-            func = None if node is None else node.func
-            if isinstance(func, ge.DataTensor):
-                header.append(f'{arg}.dtype')
+            arg_funcs[arg] = None if node is None else node.func
+
+        def shape_cells(arg, ranks, sigs, dtypes, data_format):
+            if arg not in sigs:
+                return []
+            return [ ''.join(s * ranks[s] for s in sigs[arg]) ]
+
+        def tensor_cells(arg, ranks, sigs, dtypes, data_format):
+            return shape_cells(arg, ranks, sigs, dtypes, data_format) + [
+                    dtypes[arg] ]
+
+        def format_cells(arg, ranks, sigs, dtypes, data_format):
+            return [ data_format.value() ]
+
+        # type(func) => (extra header columns, row cell function)
+        dispatch = {
+                ge.DataTensor: (['dtype'], tensor_cells),
+                ge.DataFormat: ([], format_cells)
+                }
+        default = ([], shape_cells)
+        arg_cells = [ (arg, dispatch.get(type(arg_funcs[arg]), default)) 
+                for arg in arg_order ]
+
+        header = []
+        for arg, (sfx, _) in arg_cells:
+            header.append(self._arg_shape_name(arg))
+            header.extend(f'{arg}.{s}' for s in sfx)
 
         rows = [header]
-        shape_types = (ge.DataTensor, ge.ShapeList, ge.ShapeInt, ge.ShapeTensor)
 
         for ranks, sigs, dtypes, data_format in inventory:
             row = []
-            for arg in arg_order:
-                node = self.arg_gen_nodes.get(arg, None)
-                func = None if node is None else node.func
-                if isinstance(func, ge.DataFormat): 
-                    row.append(data_format.value())
-                elif arg in sigs:
-                    sig = sigs[arg]
-                    inst = ''.join(s * ranks[s] for s in sig)
-                    row.append(inst)
-                if isinstance(func, ge.DataTensor):
-                    dtype = dtypes[arg]
-                    row.append(dtype)
-                else:
-                    pass
+            for arg, (_, cells) in arg_cells:
+                row.extend(cells(arg, ranks, sigs, dtypes, data_format))
             rows.append(row)
 
         table, _ = base.tabulate(rows, '  ', left_align=True)
@@ -376,8 +519,8 @@ class OpSchema(object):
         Display a table of available signature layouts for shaped
         arguments
         """
-        sigs_node = self._gen_node(ge.SigMap)
-        layout_node = self._gen_node(ge.Layout, base.LAYOUT)
+        sigs_node = self.sigmap_gnode
+        layout_node = self.layout_gnode
         out_nodes = (sigs_node, layout_node)
         ancs = fgraph.get_ancestors(*out_nodes)
         gen = fgraph.gen_graph_values(ancs, out_nodes)
@@ -424,7 +567,7 @@ class OpSchema(object):
                     spec = f'rank({iname}) in [{lo}, {hi}]'
             rows.append([spec, ''])
 
-        for cons in self.sum_range_constraints:
+        for cons in self.sum_range_constraints.values():
             inds = (self.index[idx] for idx in cons.sig)
             idxs = ','.join(ind.display_name(use_full_names) for ind in inds)
             if cons.lo == cons.hi:
@@ -439,26 +582,50 @@ class OpSchema(object):
         report = '\n'.join(table)
         return report 
 
+    def _dims_node_lists(self):
+        """
+        Return a map of kind => [node, ...] for the GenDims, CompDims and
+        DimsInput nodes of the dims_graph, with CompDims nodes in topological
+        order.  These are needed on every inference, and the dims_graph only
+        ever grows, so the lists are rebuilt only when its size changes.
+        Callers must not modify the lists.
+        """
+        size = len(self.dims_graph)
+        if self.dims_node_lists is None or self.dims_node_lists[0] != size:
+            kinds = (ge.GenDims, ge.CompDims, ge.DimsInput)
+            lists = { kind: [] for kind in kinds }
+            for node in fgraph._topo_sort(self.dims_graph.values()):
+                kind = type(node.func)
+                if kind in lists:
+                    lists[kind].append(node)
+            self.dims_node_lists = (size, lists)
+        return self.dims_node_lists[1]
+
     def _gen_dims_nodes(self):
-        nodes = []
-        for sig, node in self.dims_graph.items():
-            if isinstance(node.func, ge.GenDims):
-                nodes.append(node)
-        return nodes
+        return self._dims_node_lists()[ge.GenDims]
 
     def _comp_dims_nodes(self):
-        nodes = []
-        for node in fgraph._topo_sort(self.dims_graph.values()):
-            if isinstance(node.func, ge.CompDims):
-                nodes.append(node)
-        return nodes
+        return self._dims_node_lists()[ge.CompDims]
+
+    def _comp_dims_names(self):
+        """
+        Return the tuple of computed indices, in the topological order of
+        their CompDims nodes.  Rebuilt only when the dims_graph changes size,
+        like _dims_node_lists.
+        """
+        size = len(self.dims_graph)
+        if self.comp_dims_names is None or self.comp_dims_names[0] != size:
+            names = tuple(n.sub_name for n in self._comp_dims_nodes())
+            self.comp_dims_names = (size, names)
+        return self.comp_dims_names[1]
 
     def _dims_input_nodes(self):
-        nodes = []
-        for node in self.dims_graph.values():
-            if isinstance(node.func, ge.DimsInput):
-                nodes.append(node)
-        return nodes
+        return self._dims_node_lists()[ge.DimsInput]
+
+    def _dims_result_nodes(self):
+        # the GenDims and CompDims nodes, which together hold all index dims
+        lists = self._dims_node_lists()
+        return lists[ge.GenDims] + lists[ge.CompDims]
 
     def _dims_arg_nodes(self):
         """
@@ -606,8 +773,13 @@ class OpSchema(object):
     def explain(self, include_inventory=False):
         """
         Produce a standard format report showing all schema logic, as seen
-        in schema_report.txt.  
+        in schema_report.txt.  The schema is fixed once initialized, so the
+        report is computed once for each value of {include_inventory}.
         """
+        final = self.explain_cache.get(include_inventory, None)
+        if final is not None:
+            return final
+
         index_inv = self.index_inventory()
         signature = self.signature_report()
         index_ranks = self.index_ranks_report()
@@ -645,6 +817,7 @@ class OpSchema(object):
             finals.append(f'Inventory\n\n{inventory}')
 
         final = '\n\n'.join(finals)
+        self.explain_cache[include_inventory] = final
         return final
 
     def _report(self):
@@ -701,33 +874,49 @@ class OpSchema(object):
 
     def _get_arg(self, arg_name):
         """Retrieve the value of {arg_name} argument at call-time."""
-        if arg_name not in self.arg_order:
+        # self.arguments holds every parameter once defaults are applied
+        try:
+            return self.arguments[arg_name]
+        except KeyError:
             raise SchemaError(
                 f'\'{arg_name}\' not a known parameter. '
                 f'Known parameters are: {self.arg_order}')
-        return self.arguments[arg_name]
 
     def _arg_shape_name(self, arg_name):
-        if arg_name in [*self.data_tensors, *self.return_tensors]:
+        if arg_name in self.tensor_names:
             return f'{arg_name}.shape'
         else:
             return arg_name
 
     def _check_sig(self, signature, name):
-        if any(s not in self.index.keys() for s in signature):
+        """
+        Check that all indices in {signature} are registered, and return the
+        interned signature
+        """
+        signature = sys.intern(signature)
+        # indices are never removed, so a signature found valid stays valid
+        if signature in self.checked_sigs:
+            return signature
+        if not self.index.keys() >= set(signature):
             raise SchemaError(
                 f'Signature "{signature}" associated with \'{name}\' '
                 f'contains one or more unregistered indices. '
                 f'Current known indices are: '
                 f"{','.join(self.index.keys())}"
                 f'Call OpSchema.add_index with the missing index.')
+        self.checked_sigs.add(signature)
+        return signature
 
     def _init_pred_graph(self):
         P.set_registry(self.pred_graph)
         schema = P.add_node(pr.Schema(self))
+        self.schema_pnode = schema
         shapes = P.add_node(pr.ShapeMap())
+        self.shape_map_pnode = shapes
         dtypes = P.add_node(pr.DTypes())
+        self.dtypes_pnode = dtypes
         argmap = P.add_node(pr.ArgMap())
+        self.argmap_pnode = argmap
         inventory = P.add_node(pr.Inventory(self), dtypes, shapes, argmap)
         self.inventory_node = inventory
 
@@ -744,11 +933,14 @@ class OpSchema(object):
         self.obs_args = G.add_node(nf.ObservedValue('args'))
         layout_iobj = nf.Layout(self)
         layout = G.add_node(layout_iobj)
+        self.layout_inode = layout
         index_ranks = G.add_node(nf.IndexRanks())
+        self.ranks_inode = index_ranks
         dtypes_obj = nf.DTypes(self)
         self.dtypes = G.add_node(dtypes_obj, self.obs_dtypes, index_ranks,
                 layout)
         sigs = G.add_node(ge.SigMap())
+        self.sigmap_inode = sigs
 
         indels_obj = nf.ArgIndels(self)
         arg_indels = G.add_node(indels_obj, index_ranks, sigs, self.obs_shapes,
@@ -768,20 +960,24 @@ class OpSchema(object):
         G.set_registry(self.gen_graph)
         layout_gobj = ge.Layout(self)
         layout = G.add_node(layout_gobj)
+        self.layout_gnode = layout
         index_ranks = G.add_node(ge.IndexRanks())
+        self.ranks_gnode = index_ranks
         impl_obj = ge.DTypesNotImpl(self)
         self.dtypes_gfilt = G.add_node(impl_obj, index_ranks, layout)
         sigs = G.add_node(ge.SigMap())
+        self.sigmap_gnode = sigs
         arg_ranks = G.add_node(ge.ArgRanks(self), index_ranks, sigs)
         arg_indels = G.add_node(ge.ArgIndels(self), arg_ranks)
         arg_muts_obj = ge.ArgMutations(self)
         arg_muts = G.add_node(arg_muts_obj, arg_indels, index_ranks, sigs)
+        self.arg_muts_gnode = arg_muts
         self.args_gnode = G.add_node(ge.Args())
 
     def _init_dims_graph(self):
         G.set_registry(self.dims_graph)
         dobj = ge.DimsInput(self, base.INDEX_RANKS)
-        G.add_node(dobj)
+        self.ranks_dnode = G.add_node(dobj)
 
     def _finalize(self):
         # check that every index appearing in an 
@@ -813,8 +1009,20 @@ class OpSchema(object):
                         f'indexes must appear in at least one input '
                         f'signature.')
 
+        # arguments in call order, then returns.  see _shape_key_order
+        key_order = itertools.chain(self.arg_order, self.return_tensors)
+        self.shape_key_pos = { key: pos for pos, key in enumerate(key_order) }
+
+        # both are evaluated on every call, so are sorted once here
         pred = set(self.pred_graph.values()).difference(self.return_nodes)
-        self.predicate_nodes = pred
+        self.predicate_nodes = fgraph._topo_sort(pred)
+        self.return_nodes = fgraph._topo_sort(self.return_nodes)
+
+        # rank constraints on single indexes are constant over all calls
+        for idx, ind in self.index.items():
+            if ind.primary():
+                self.gen_graph[idx].func.fold_constants()
+                self.inf_graph[idx].func.fold_constants()
 
     def _prep_inference(self, obs_dtypes, obs_shapes, obs_args):
         self.obs_dtypes.set_cached(obs_dtypes)
@@ -826,88 +1034,198 @@ class OpSchema(object):
 
     def generate_args(self, rand_seed=12345):
         live = self.gen_graph.values()
-        out = [self._gen_node(ge.Args)]
+        out = [self.args_gnode]
         self.gen_rng.seed(rand_seed)
         for op_args in fgraph.gen_graph_values(live, out, self):
             yield op_args[0] # extract tuple element
 
-    def validate(self, out_dir, test_ids, skip_ids, dtype_err_quota,
-            test_edits, rand_seed, show_traceback=True):
-        if not os.path.exists(out_dir):
-            raise RuntimeError(
-                f'{type(self).__qualname__}: Could not open output path '
-                f'\'{out_dir}\' for report generation')
-
-        self.dtype_err_quota = dtype_err_quota
-        self.avail_test_edits = test_edits
-
-        report_fh = open(os.path.join(out_dir, f'{self.op_path}.txt'), 'w')
-        summary_fh = open(os.path.join(out_dir, f'{self.op_path}.sum.txt'), 'w')
-        cats = [ 'TP', 'TN', 'FP', 'FN' ]
-        stats = { k: 0 for k in cats }
-
-        op_args_gen = self.generate_args(rand_seed)
+    def _select_tests(self, op_args_gen, test_ids, skip_ids, duplicates):
+        """
+        Yield (test_id, op_args) for each generated test selected by
+        {test_ids} and not excluded by {skip_ids}.  If {test_ids} is None,
+        generated tests identical to an earlier one are skipped, since running
+        the framework op on them again cannot change the outcome.  Each
+        skipped test is appended to {duplicates} as (test_id, earlier_test_id).
+        test_id numbering is unaffected.
+        """
+        if test_ids is not None and len(test_ids) == 0:
+            return
 
+        # frozen (arg, OpArg.key()) tuples => test_id, see _test_key
+        seen_args = {}
+        max_seen = 10000
         for test_id, op_args in enumerate(op_args_gen, 1):
             if skip_ids is not None and test_id in skip_ids:
                 continue
 
             if test_ids is not None:
-                if len(test_ids) == 0:
-                    break
                 if test_id not in test_ids:
                     continue
-                else:
-                    test_ids.remove(test_id)
+                test_ids.remove(test_id)
+                yield test_id, op_args
+                # stop before generating another configuration
+                if len(test_ids) == 0:
+                    return
+            else:
+                key = self._test_key(op_args)
+                if key is not None:
+                    dup_id = seen_args.get(key, None)
+                    if dup_id is not None:
+                        duplicates.append((test_id, dup_id))
+                        continue
+                    if len(seen_args) == max_seen:
+                        seen_args.clear()
+                    seen_args[key] = test_id
+                yield test_id, op_args
+
+    def _test_key(self, op_args):
+        """
+        Return a hashable key identifying the values of {op_args}, or None if
+        some value is unhashable, in which case the test is never treated as a
+        duplicate.
+        """
+        try:
+            return base.freeze(tuple((k, v.key()) for k, v in op_args.items()))
+        except TypeError:
+            return None
 
-            # self.show_graph_calls = True
-            arg_dict = { k: v.value() for k, v in op_args.items() }
-            # print(test_id, op_args)
-            # continue
-            string_err = io.BytesIO()
-            try:
-                # proc_wrap(self, op_args)
+    def _test_arg_keys(self, op_args):
+        """
+        Return the keys of {op_args} in the framework op's argument order.
+        Generated tests for an op always have the same keys, so the ordering
+        is computed once per distinct key set.
+        """
+        keys = tuple(op_args.keys())
+        arg_keys = self.test_arg_keys.get(keys, None)
+        if arg_keys is None:
+            arg_keys = [ k for k in self.arg_order if k in op_args ]
+            self.test_arg_keys[keys] = arg_keys
+        return arg_keys
+
+    def _run_test(self, test_id, op_args, show_traceback, drain_err=None):
+        """
+        Run the wrapped op on {op_args}.  Returns (test_id, cat, report,
+        summary), where cat is one of 'TP', 'TN', 'FP', 'FN', and report and
+        summary are the entries for the report and summary files.
+
+        {drain_err} is the function yielded by an enclosing stderr_capture.
+        If None, stderr is redirected for this test alone.
+        """
+        # self.show_graph_calls = True
+        arg_dict = { k: v.value() for k, v in op_args.items() }
+        # print(test_id, op_args)
+        # continue
+        try:
+            # proc_wrap(self, op_args)
+            if drain_err is None:
+                string_err = io.BytesIO()
+                drain_err = string_err.getvalue
                 with stderr_redirector(string_err):
                     self.wrapped_op(**arg_dict)
-                    # pass
-            except (OpSchemaInternalError, SchemaError) as ex:
-                print(string_err.getvalue().decode('UTF-8'))
-                raise ex
-            except BaseException as ex:
-                pass
-                # raise ex
+            else:
+                drain_err()
+                self.wrapped_op(**arg_dict)
+                # pass
+        except (OpSchemaInternalError, SchemaError) as ex:
+            print(drain_err().decode('UTF-8'))
+            raise ex
+        except BaseException as ex:
+            pass
+            # raise ex
+
+        # the type of op_error is checked while producing the report below
+        key = (self.op_error is None, self.framework_exc_msg is None)
+        cat = _TEST_CATEGORY[key]
+
+        arg_keys = self._test_arg_keys(op_args)
+        arg_fields = ', '.join(f'{k}={op_args[k]}' for k in arg_keys)
+        call = f'## {test_id}\t{cat}\t{self.op_path}: {arg_fields}'
+        lines = [ f'\n\n{call}', 'TensorFlow Exception' ]
+        if show_traceback:
+            tb = self.framework_tb
+            lines.append('' if tb is None else ''.join(traceback.format_tb(tb)))
+        lines.append(f'{self.framework_exc_msg}\n')
+        lines.append(f'{self._report()}')
+        edit_summary = self._report_edit_summary()
+        summary = f'{call}\t{edit_summary}'
+        return test_id, cat, '\n'.join(lines), summary
+
+    def validate(self, out_dir, test_ids, skip_ids, dtype_err_quota,
+            test_edits, rand_seed, show_traceback=True, num_workers=1):
+        """
+        Run the generated tests, classifying each as TP, TN, FP or FN, and
+        write the reports to {out_dir}.  If {num_workers} > 1, tests are
+        generated here but run in that many worker processes, each with its own
+        instance of the schema.
+        """
+        if not os.path.exists(out_dir):
+            raise RuntimeError(
+                f'{type(self).__qualname__}: Could not open output path '
+                f'\'{out_dir}\' for report generation')
+        if not (isinstance(num_workers, int) and num_workers >= 1):
+            raise RuntimeError(
+                f'{type(self).__qualname__}: num_workers must be a positive '
+                f'integer.  Got \'{num_workers}\'')
 
-            if self.op_error is None:
-                cat = 'TN' if self.framework_exc_msg is None else 'FN'
+        self.dtype_err_quota = dtype_err_quota
+        self.avail_test_edits = test_edits
+        oparg._cached_random_tensor.cache_clear()
 
-            elif isinstance(self.op_error, pr.ErrorReport):
-                cat = 'FP' if self.framework_exc_msg is None else 'TP'
+        bufsize = 1 << 20
+        report_path = os.path.join(out_dir, f'{self.op_path}.txt')
+        summary_path = os.path.join(out_dir, f'{self.op_path}.sum.txt')
+        cats = [ 'TP', 'TN', 'FP', 'FN' ]
+        progress_every = 50
+        stats = { k: 0 for k in cats }
 
-            else:
-                assert isinstance(self.op_error, list)
-                cat = 'FP' if self.framework_exc_msg is None else 'TP'
+        op_args_gen = self.generate_args(rand_seed)
+        duplicates = [] # (test_id, earlier_test_id), see _select_tests
+        tests = self._select_tests(op_args_gen, test_ids, skip_ids, duplicates)
 
-            stats[cat] += 1
+        def show_progress(test_id):
             progress = '  '.join(f'{c}: {stats[c]:-5d}' for c in cats)
-            print(f'\rTest: {test_id:-5d}  {progress}', end='')
-            arg_fields = ', '.join(f'{k}={op_args[k]}' for k in self.arg_order
-                    if k in op_args)
-            call = f'## {test_id}\t{cat}\t{self.op_path}: {arg_fields}'
-            print(f'\n\n{call}', file=report_fh)
-            
-            print('TensorFlow Exception', file=report_fh)
-            if show_traceback:
-                print(''.join(self.framework_tblines), file=report_fh)
-            print(f'{self.framework_exc_msg}\n', file=report_fh)
-
-            print(self._report(), file=report_fh)
-            edit_summary = self._report_edit_summary()
-            summary = f'{call}\t{edit_summary}'
-            print(summary, file=summary_fh)
-
-        print()
-        report_fh.close()
-        summary_fh.close()
+            print(f'\rTest: {test_id:-5d}  {progress}', end='', flush=True)
+
+        def write_results(results):
+            test_id = 0
+            for num_run, (test_id, cat, test_report, summary) in enumerate(results):
+                stats[cat] += 1
+                if num_run % progress_every == 0:
+                    show_progress(test_id)
+                print(test_report, file=report_fh)
+                print(summary, file=summary_fh)
+            return test_id
+
+        try:
+            with open(report_path, 'w', buffering=bufsize) as report_fh, \
+                    open(summary_path, 'w', buffering=bufsize) as summary_fh:
+                if num_workers == 1:
+                    # redirect stderr once for all tests rather than once per
+                    # test
+                    with stderr_capture() as drain_err:
+                        results = (self._run_test(*test, show_traceback,
+                            drain_err) for test in tests)
+                        test_id = write_results(results)
+                else:
+                    # TensorFlow is not fork-safe, so workers are spawned
+                    ctx = multiprocessing.get_context('spawn')
+                    with ProcessPoolExecutor(num_workers, mp_context=ctx,
+                            initializer=_init_validate_worker,
+                            initargs=(self.op_path,)) as pool:
+                        # closing runs the generator's cleanup before the
+                        # pool shuts down, even if writing the results fails
+                        with closing(_stream_results(pool, tests,
+                            show_traceback, 16, 4 * num_workers)) as results:
+                            test_id = write_results(results)
+                for dup_id, earlier_id in duplicates:
+                    print(f'## {dup_id}\tSKIPPED\tsame arguments as test '
+                            f'{earlier_id}', file=summary_fh)
+        finally:
+            # release the tensors held for this run
+            oparg._cached_random_tensor.cache_clear()
+
+        show_progress(test_id)
+        print(f'  skipped: {len(duplicates):-5d}')
 
     # ============ PUBLIC API ====================
     def add_index(self, idx, description, rank_cons=None):
@@ -925,8 +1243,8 @@ class OpSchema(object):
         if idx in self.index:
             raise SchemaError(f'Index \'{idx}\' already registered') 
 
-        ranks_gnode = self._gen_node(ge.IndexRanks)
-        ranks_inode = self._inf_node(ge.IndexRanks) # same class
+        ranks_gnode = self.ranks_gnode
+        ranks_inode = self.ranks_inode
 
         if isinstance(rank_cons, str):
             primary_idx = rank_cons
@@ -974,7 +1292,7 @@ class OpSchema(object):
             ranks_gnode.append_parent_sn(idx_gnode)
 
             G.set_registry(self.inf_graph)
-            sigs_inode = self._inf_node(ge.SigMap)
+            sigs_inode = self.sigmap_inode
             idx_iobj = nf.RankRange(self, idx)
             idx_inode = G.add_node_sn(idx_iobj)
             ranks_inode.append_parent_sn(idx_inode)
@@ -1007,26 +1325,33 @@ class OpSchema(object):
 
     def _get_dims_nodes(self, sig):
         # get each dims_graph node holding each idx in sig
-        pa_names = set()
-        kinds = (ge.CompDims, ge.GenDims)
-        gvals = self.dims_graph.items()
-        gnames = [name for name, nd in gvals if isinstance(nd.func, kinds)]
+        nodes = {} # used as an ordered set
         for idx in sig:
             if idx not in self.index:
                 raise SchemaError(
                     f'Index \'{idx}\', found in sig \'{sig}\' is not '
                     f'yet registered with add_index')
 
-            pa_name = next((name for name in gnames if idx in name), None)
-            if pa_name is None:
+            node = self.dims_index_nodes.get(idx, None)
+            if node is None:
                 raise SchemaError(
                     f'Index \'{idx}\' mentioned in sig \'{sig}\' has not '
                     f'yet been registered by a call to comp_dims, gen_dims or '
                     f'gen_dims_func.  Must be registered before it is used '
                     f'as input to another call')
-            pa_names.add(pa_name)
-        nodes = [ self.dims_graph[n] for n in pa_names ]
-        return nodes
+            nodes[node] = None
+        return list(nodes)
+
+    def _add_dims_node(self, dims_obj, *parents):
+        """
+        Add {dims_obj} (a GenDims or CompDims) to the dims_graph, and record it
+        as the node holding each index of its signature
+        """
+        G.set_registry(self.dims_graph)
+        node = G.add_node_sn(dims_obj, *parents)
+        for idx in dims_obj.sub_name:
+            self.dims_index_nodes.setdefault(idx, node)
+        return node
 
     def _get_indexes(self, sig):
         inds = []
@@ -1059,6 +1384,13 @@ class OpSchema(object):
         pri_idx = pri.pop()
         return pri_idx
 
+    def _pri_indices(self, sig):
+        """
+        Return the distinct primary indices of {sig} in order.  A constraint on
+        RANK(sig) is registered once on the rank node of each.
+        """
+        return dict.fromkeys(self.index[idx].pri_idx for idx in sig)
+
     def _get_rank_idx(self, in_sig, out_sig):
         pri_idx_in = self._get_bcast_idx(in_sig)
         pri_idx_out = self._get_bcast_idx(out_sig)
@@ -1106,7 +1438,7 @@ class OpSchema(object):
         except SchemaError as ex:
             raise SchemaError(f'Error constructing gen_dims for {out_sig}:\n{ex}')
 
-        mut_gnode = self._gen_node(ge.ArgMutations)
+        mut_gnode = self.arg_muts_gnode
         for idx in out_sig:
             ind = self.index[idx]
             ind.dims_node_cls = ge.GenDims
@@ -1121,8 +1453,8 @@ class OpSchema(object):
             *arg_names)
         G.set_registry(self.dims_graph)
         parents = self._get_dims_nodes(in_sig)
-        ranks_dnode = self._dims_node(ge.DimsInput, base.INDEX_RANKS)
-        G.add_node_sn(gdims, ranks_dnode, *parents, *arg_parents)
+        ranks_dnode = self.ranks_dnode
+        self._add_dims_node(gdims, ranks_dnode, *parents, *arg_parents)
 
     def gen_dims_calc(self, out_sig, func, in_sig, *arg_names):
         """
@@ -1184,6 +1516,10 @@ class OpSchema(object):
 
         arg_names must be argument names registered with arg_option or
         arg_layout.
+
+        {func} must be a pure function of its arguments.  Component-wise
+        results are cached and shared among every computed index registered
+        with the same {func}.
         """
         return self._comp_dims(out_idx, func, tfunc, in_sig, False, *arg_names)
 
@@ -1191,16 +1527,17 @@ class OpSchema(object):
         """
         Same as comp_dims, except component-wise computation is performed.
         That is, the individual dimensions of each index dimension are fed to
-        {func} one at a time to produce one output component.
+        {func} one at a time to produce one output component.  As with
+        comp_dims, {func} must be pure, since its results are cached.
         """
         return self._comp_dims(out_idx, func, tfunc, in_sig, True, *arg_names)
 
     def _maybe_add_arg_parent(self, node, arg_name):
         if arg_name == base.LAYOUT:
-            arg_gnode = self._gen_node(ge.Layout, base.LAYOUT) 
+            arg_gnode = self.layout_gnode 
             node.maybe_append_parent_sn(arg_gnode)
 
-        elif arg_name in self.arg_order:
+        elif arg_name in self.arg_index:
             arg_gnode = self.arg_gen_nodes[arg_name]
             node.maybe_append_parent_sn(arg_gnode)
 
@@ -1229,7 +1566,7 @@ class OpSchema(object):
         human-readable formulae of the computation.
         """
         self._check_out_sig(out_idx)
-        mut_gnode = self._gen_node(ge.ArgMutations)
+        mut_gnode = self.arg_muts_gnode
 
         G.set_registry(self.dims_graph)
 
@@ -1246,12 +1583,11 @@ class OpSchema(object):
         else:
             pri_idx = None
 
-        nargs = len(arg_names)
-        ranks_dnode = self._dims_node(ge.DimsInput, base.INDEX_RANKS)
+        ranks_dnode = self.ranks_dnode
         cdims = ge.CompDims(self, out_idx, in_sig, cwise, func, tfunc, pri_idx,
                 arg_names)
         parents = self._get_dims_nodes(in_sig)
-        G.add_node_sn(cdims, ranks_dnode, *parents, *arg_parents)
+        self._add_dims_node(cdims, ranks_dnode, *parents, *arg_parents)
         
         # add the non-negativity constraint
         self.dims_pred_rng(out_idx, 0, None) 
@@ -1260,20 +1596,17 @@ class OpSchema(object):
         """
         Declare that the rank of {sig} be in [{min_val}, {max_val}]
         """
-        self._check_sig(sig, 'rank limits')
-        for idx in sig:
-            if idx not in self.index:
-                raise SchemaError(
-                    f'Index \'{idx}\' mentioned in signature \'{sig}\' was '
-                    f'not registered with add_index.  All indices must first '
-                    f'be registered before being used in a limit_ranks call')
+        sig = self._check_sig(sig, 'rank limits')
 
         # add constraint to each node in the sig
         pri_sig = ''.join(sorted(self.index[idx].pri_idx for idx in sig))
+        key = (pri_sig, min_val, max_val)
+        if key in self.sum_range_constraints:
+            # an identical constraint is already applied
+            return
         cons = base.SumRangeConstraint(pri_sig, min_val, max_val)
-        self.sum_range_constraints.append(cons)
-        for idx in sig:
-            pri_idx = self.index[idx].pri_idx
+        self.sum_range_constraints[key] = cons
+        for pri_idx in self._pri_indices(sig):
             gnode = self.gen_graph[pri_idx]
             gnode.func.add_schema_constraint(cons)
             inode = self.inf_graph[pri_idx]
@@ -1371,7 +1704,7 @@ class OpSchema(object):
         G.set_registry(self.gen_graph)
         pred_obj = pr.ArgInt(arg_name, lo, hi)
         gen_obj = ge.Int(self, lo, hi)
-        schema = self._pred_node(pr.Schema)
+        schema = self.schema_pnode
         p_arg = P.add_node(pred_obj, schema)
         g_arg = G.add_node(gen_obj)
         self.arg_gen_nodes[arg_name] = g_arg
@@ -1394,9 +1727,9 @@ class OpSchema(object):
 
         P.set_registry(self.pred_graph)
         options_pobj = pr.Options(arg_name, options_gobj, options)
-        schema = self._pred_node(pr.Schema)
+        schema = self.schema_pnode
         p_arg = P.add_node(options_pobj, schema)
-        arg_node = self._pred_node(pr.ArgMap)
+        arg_node = self.argmap_pnode
         arg_node.append_parent_sn(p_arg)
 
     def arg_layout(self, arg_name, formats, rank_idx):
@@ -1412,17 +1745,19 @@ class OpSchema(object):
                 raise SchemaError(f'arg_layout: formats must be a dict with '
                         f'tuple values')
         self.data_formats = base.DataFormats(arg_name, formats, rank_idx)
+        self.num_layouts = self.data_formats.num_layouts()
         
         # define the real arg 
         G.set_registry(self.gen_graph)
-        layout = self._gen_node(ge.Layout, base.LAYOUT)
-        ranks = self._gen_node(ge.IndexRanks)
+        layout = self.layout_gnode
+        ranks = self.ranks_gnode
         df_gobj = ge.DataFormat(self, self.data_formats, arg_name, rank_idx)
         df_gnode = G.add_node(df_gobj, ranks, layout) 
+        self.data_format_gnode = df_gnode
 
         G.set_registry(self.inf_graph)
-        layout_inode = self._inf_node(nf.Layout)
-        ranks_inode = self._inf_node(nf.IndexRanks)
+        layout_inode = self.layout_inode
+        ranks_inode = self.ranks_inode
         df_iobj = nf.DataFormat(self, self.data_formats, arg_name)
         df_inode = G.add_node(df_iobj, ranks_inode, layout_inode, self.obs_args)
         self.data_format_inode = df_inode
@@ -1433,50 +1768,72 @@ class OpSchema(object):
             self.args_gnode.append_parent_sn(df_gnode)
 
         P.set_registry(self.pred_graph)
-        schema = self._pred_node(pr.Schema)
+        schema = self.schema_pnode
         data_format_obj = pr.DataFormat(self.data_formats, df_gobj, arg_name)
         p_arg = P.add_node(data_format_obj, schema) 
 
-        arg_node = self._pred_node(pr.ArgMap)
+        arg_node = self.argmap_pnode
         if arg_name is None:
             arg_node.append_parent(p_arg)
         else:
             arg_node.append_parent_sn(p_arg)
 
     def _check_sigs_layout(self, arg_name, sigs_list):
-        if self.data_formats is None:
-            # arg_layout is implicitly 1
-            num_layouts = 1
+        num_layouts = self.num_layouts
+        # args commonly share signatures, so share one copy of each
+        num_sigs = len(sigs_list)
+        if num_sigs == 1:
+            # the common single signature case is interned only once
+            sigs_list = (sys.intern(sigs_list[0]),) * num_layouts
+        elif num_sigs == num_layouts:
+            sigs_list = tuple(sys.intern(sig) for sig in sigs_list)
         else:
-            num_layouts = self.data_formats.num_layouts()
-        if len(sigs_list) == 1:
-            sigs_list = sigs_list * num_layouts
-
-        if len(sigs_list) != num_layouts:
             raise SchemaError(
                 f'{type(self).__qualname__}: registering \'{arg_name}\' '
-                f'there are {self.num_layouts} '
+                f'there are {num_layouts} '
                 f'layouts (as established by the call to \'arg_layout\') but '
-                f'{len(sigs_list)} elements of \'sigs\' argument.')
-        return sigs_list 
+                f'{num_sigs} elements of \'sigs\' argument.')
+        return self.sigs_lists.setdefault(sigs_list, sigs_list)
+
+    def _add_sig_nodes(self, name, sigs_list):
+        """
+        Add the ge.Sig node for {name} to the gen_graph and inf_graph, feeding
+        their SigMap nodes.  {sigs_list} has one signature per layout, as
+        returned by _check_sigs_layout.  Leaves the inf_graph registry set.
+        """
+        # ge.Sig is stateless beyond its sigs, so one object serves both graphs
+        sig_obj = ge.Sig(self, name, sigs_list)
+        G.set_registry(self.gen_graph)
+        sig_gnode = G.add_node(sig_obj, self.layout_gnode)
+        self.sigmap_gnode.append_parent_sn(sig_gnode)
 
-    def _arg_shape_func(self, arg_name, sigs_list, shape_pnode, arg_gobj, kind): 
+        G.set_registry(self.inf_graph)
+        sig_inode = G.add_node(sig_obj, self.layout_inode)
+        self.sigmap_inode.append_parent_sn(sig_inode)
+
+    def _arg_shape_func(self, arg_name, sigs_list, shape_pnode, arg_gobj): 
         """
         Backend function for arg_shape_* API functions.
         sigs_list must be a list of either 1 or num_layout elements.  If 1, it
         is implicitly broadcasted to num_layouts
         """
-        all_idxs = { idx for sig in sigs_list for idx in sig }
+        all_idxs = dict.fromkeys(''.join(sigs_list))
         for idx in all_idxs:
             ind = self.index[idx]
             ind.has_insig = True
+        self._add_shape_arg(arg_name, sigs_list, shape_pnode, arg_gobj)
 
+    def _add_shape_arg(self, arg_name, sigs_list, shape_pnode, arg_gobj):
+        """
+        Add the graph nodes for a shape-defining argument {arg_name}.  The
+        indices in {sigs_list} must already be marked as appearing in a
+        signature.
+        """
         sigs_list = self._check_sigs_layout(arg_name, sigs_list)
         P.set_registry(self.pred_graph)
 
-        arg_gshapes = self._gen_node(ge.ArgMutations)
-        arg_ishapes = self._inf_node(nf.IndexUsage)
-        dtypes_gnode = self._gen_node(ge.DTypesNotImpl)
+        arg_gshapes = self.arg_muts_gnode
+        dtypes_gnode = self.dtypes_gfilt
 
         G.set_registry(self.gen_graph)
         if isinstance(arg_gobj, ge.DataTensor):
@@ -1484,30 +1841,15 @@ class OpSchema(object):
         else:
             arg_gnode = G.add_node(arg_gobj, arg_gshapes)
 
-        G.set_registry(self.inf_graph)
-
         self.args_gnode.append_parent_sn(arg_gnode)
         # self.args_inode.append_parent_sn(arg_inode)
 
         self.arg_gen_nodes[arg_name] = arg_gnode
         
-        G.set_registry(self.gen_graph)
-        sigmap_gnode = self._gen_node(ge.SigMap)
-        layout_gnode = self._gen_node(ge.Layout, base.LAYOUT)
-        sig_gobj = ge.Sig(self, arg_name, sigs_list)
-        sig_gnode = G.add_node(sig_gobj, layout_gnode)
-        sigmap_gnode.append_parent_sn(sig_gnode)
+        self._add_sig_nodes(arg_name, sigs_list)
 
-        G.set_registry(self.inf_graph)
-        sigmap_inode = self._inf_node(ge.SigMap)
-        layout_inode = self._inf_node(ge.Layout)
-        sig_iobj = ge.Sig(self, arg_name, sigs_list)
-        sig_inode = G.add_node(sig_iobj, layout_inode)
-        sigmap_inode.append_parent_sn(sig_inode)
-
-        shape_map = self._pred_node(pr.ShapeMap)
+        shape_map = self.shape_map_pnode
         shape_map.append_parent_sn(shape_pnode)
-        self.shape_args.append(arg_name)
 
     def arg_tensor(self, arg_name, *sigs):
         """
@@ -1518,34 +1860,33 @@ class OpSchema(object):
         called.  If len(sigs) > 1, then arg_layout is required to be called
         before this call.
         """
-        schema = self._pred_node(pr.Schema)
-        shp_pobj = pr.TensorShape(arg_name)
+        # all pred nodes are added here, while the registry is set, before
+        # _arg_shape_func adds the gen and inf nodes
+        P.set_registry(self.pred_graph)
+        schema = self.schema_pnode
         arg_gobj = ge.DataTensor(self, arg_name)
         arg_pobj = pr.DataTensor(arg_name, arg_gobj)
         arg_p = P.add_node(arg_pobj, schema)
         shp_pobj = pr.TensorShape(arg_name)
         shp_p = P.add_node(shp_pobj, arg_p)
-        kind = ShapeKind.DataTensor
-        self._arg_shape_func(arg_name, sigs, shp_p, arg_gobj, kind)
-
-        P.set_registry(self.pred_graph)
-        dtypes = self._pred_node(pr.DTypes)
         tensor_dtype_obj = pr.TensorDType(arg_name)
         dtype = P.add_node(tensor_dtype_obj, arg_p)
-        dtypes.append_parent_sn(dtype)
+        self.dtypes_pnode.append_parent_sn(dtype)
+        self._arg_shape_func(arg_name, sigs, shp_p, arg_gobj)
+
         self.data_tensors.append(arg_name)
+        self.tensor_names.add(arg_name)
 
     def _arg_shape_list_base(self, arg_name, broadcast_mode=False, *sigs):
         """
         See arg_shape_bcast_list and arg_shape_list
         """
         P.set_registry(self.pred_graph)
-        schema = self._pred_node(pr.Schema)
+        schema = self.schema_pnode
         arg_gobj = ge.ShapeList(self, arg_name)
         arg_pobj = pr.ShapeList(arg_name, arg_gobj, broadcast_mode)
         arg_p = P.add_node(arg_pobj, schema) 
-        kind = ShapeKind.List
-        self._arg_shape_func(arg_name, sigs, arg_p, arg_gobj, kind)
+        self._arg_shape_func(arg_name, sigs, arg_p, arg_gobj)
 
     def arg_shape_bcast_list(self, arg_name, *sigs):
         """
@@ -1578,18 +1919,18 @@ class OpSchema(object):
         If {lo} and/or {hi} are provided, the argument is additionally
         validated to be in that range.
         """
-        # TODO: currently uses arg_shape_func, which assumes the arg defines
-        # the rank.  In this case, it only defines the shape as the integer 
-        # value broadcasted {rank} times.  But, the rank is not determined from
-        # this input
+        # The arg defines only the shape of {index}, as the integer value
+        # broadcasted {rank} times.  The rank is not determined from this
+        # input.  The signature is the single index, so mark it directly
+        # rather than going through _arg_shape_func
         P.set_registry(self.pred_graph)
-        schema = self._pred_node(pr.Schema)
+        schema = self.schema_pnode
         gen_obj = ge.ShapeInt(arg_name)
         ind = self.index[index]
+        ind.has_insig = True
         pred_obj = pr.ShapeInt(arg_name, lo, hi)
         arg_p = P.add_node(pred_obj, schema)
-        kind = ShapeKind.Int
-        self._arg_shape_func(arg_name, (index,), arg_p, gen_obj, kind)
+        self._add_shape_arg(arg_name, (index,), arg_p, gen_obj)
 
     def arg_shape_tensor(self, arg_name, min_elem_val, max_elem_val, *sigs):
         """
@@ -1599,12 +1940,11 @@ class OpSchema(object):
         Check that every element is in [`min_elem_val`, `max_elem_val`].
         """
         P.set_registry(self.pred_graph)
-        schema = self._pred_node(pr.Schema)
+        schema = self.schema_pnode
         gen_obj = ge.ShapeTensor(arg_name)
         pred_obj = pr.ShapeTensor(arg_name, gen_obj, min_elem_val, max_elem_val)
         arg_p = P.add_node(pred_obj, schema)
-        kind = ShapeKind.Tensor
-        self._arg_shape_func(arg_name, sigs, arg_p, gen_obj, kind)
+        self._arg_shape_func(arg_name, sigs, arg_p, gen_obj)
 
     def arg_shape_tensor2d(self, arg_name, *sigs):
         """
@@ -1615,7 +1955,8 @@ class OpSchema(object):
         defines dims(sigs[i])[d].  
 
         In the multiple layout case, sigs[i][l] is the i'th signature for
-        layout l, and ten[d,i] defines dims(sigs[i][l])[d]
+        layout l, and ten[d,i] defines dims(sigs[i][l])[d].  sigs[i] may still
+        be a single string, which then applies to every layout.
 
         Examples:
 
@@ -1637,67 +1978,66 @@ class OpSchema(object):
         layout 0: dims('b') = [1,3,5], dims('e') = [2,4,6] 
         layout 1: dims('b') = [2,4,6], dims('b') = [1,3,5]
         """
-        all_idxs = { idx for sig in sigs for idx in sig }
+        # normalize each slice's signatures to one per layout
+        sigs_lists = [ self._check_sigs_layout(arg_name, 
+            (sig,) if isinstance(sig, str) else sig) for sig in sigs ]
+        num_slices = len(sigs_lists)
+        all_idxs = dict.fromkeys(''.join(itertools.chain(*sigs_lists)))
         for idx in all_idxs:
             ind = self.index[idx]
             ind.has_insig = True
 
         P.set_registry(self.pred_graph)
         G.set_registry(self.gen_graph)
-        schema = self._pred_node(pr.Schema)
-        shape2d_gobj = ge.ShapeTensor2D(arg_name, len(sigs))
-        shape2d_pobj = pr.ShapeTensor2D(arg_name, shape2d_gobj, len(sigs))
+        schema = self.schema_pnode
+        shape2d_gobj = ge.ShapeTensor2D(arg_name, num_slices)
+        shape2d_pobj = pr.ShapeTensor2D(arg_name, shape2d_gobj, num_slices)
         p_shape2d = P.add_node(shape2d_pobj, schema)
 
-        arg_shapes = self._gen_node(ge.ArgMutations)
+        arg_shapes = self.arg_muts_gnode
         g_shape2d = G.add_node(shape2d_gobj, arg_shapes)
         self.arg_gen_nodes[arg_name] = g_shape2d
         self.args_gnode.append_parent_sn(g_shape2d)
 
-        g_sig_map = self._gen_node(ge.SigMap)
-        g_layout = self._gen_node(ge.Layout, base.LAYOUT)
-        p_shape_map = self._pred_node(pr.ShapeMap)
+        g_sig_map = self.sigmap_gnode
+        g_layout = self.layout_gnode
+        p_shape_map = self.shape_map_pnode
 
-        sigmap_inode = self._inf_node(ge.SigMap)
-        layout_inode = self._inf_node(ge.Layout)
+        sigmap_inode = self.sigmap_inode
+        layout_inode = self.layout_inode
 
-        for i, sig in enumerate(sigs):
-            prefix = f'{arg_name}.{i}'
-            # pr.ShapeMap -> pr.SliceShape
-            shp_pobj = pr.SliceShape(arg_name, i)
-            p_shp = P.add_node(shp_pobj, p_shape2d)
-            p_shape_map.append_parent_sn(p_shp)
+        # slice i of the tensor is named '{arg_name}.{i}'
+        sig_objs = [ ge.Sig(self, f'{arg_name}.{i}', sl) for i, sl in
+                enumerate(sigs_lists) ]
 
-            if isinstance(sig, str):
-                sig = [sig]
-            G.set_registry(self.gen_graph)
-            g_sig_obj = ge.Sig(self, prefix, sig)
-            g_sig = G.add_node(g_sig_obj, g_layout)
-            g_sig_map.append_parent_sn(g_sig)
+        # pr.ShapeMap -> pr.SliceShape
+        shp_pobjs = [ pr.SliceShape(arg_name, i) for i in range(num_slices) ]
+        p_shape_map.append_parents_sn(P.add_nodes(shp_pobjs, p_shape2d))
 
-            G.set_registry(self.inf_graph)
-            sig_iobj = ge.Sig(self, prefix, sig)
-            sig_inode = G.add_node(sig_iobj, layout_inode)
-            sigmap_inode.append_parent_sn(sig_inode)
+        # add all nodes of each graph while its registry is set.  G is
+        # still registered to gen_graph from above
+        g_sig_map.append_parents_sn(G.add_nodes(sig_objs, g_layout))
+
+        G.set_registry(self.inf_graph)
+        sigmap_inode.append_parents_sn(G.add_nodes(sig_objs, layout_inode))
 
     def arg_rank(self, arg_name, sig):
         """
         Register {arg_name} to be an integer argument which defines the rank of
         {sig}
         """
-        cons_name = f'rank({sig}) == \'{arg_name}\''
-
+        sig = self._check_sig(sig, arg_name)
         P.set_registry(self.pred_graph)
         rank_pobj = pr.ArgInt(arg_name, 0, None)
-        schema = self._pred_node(pr.Schema)
+        schema = self.schema_pnode
         rank_inode = P.add_node(rank_pobj, schema)
 
         P.set_registry(self.inf_graph)
-        arg_node = self._pred_node(pr.ArgMap)
+        arg_node = self.argmap_pnode
         arg_node.append_parent_sn(rank_inode)
 
         G.set_registry(self.gen_graph)
-        g_ranks = self._gen_node(ge.IndexRanks)
+        g_ranks = self.ranks_gnode
         rank_gobj = ge.RankInt(arg_name, sig)
         rank_gnode = G.add_node(rank_gobj, g_ranks)
         self.arg_gen_nodes[arg_name] = rank_gnode
@@ -1705,23 +2045,41 @@ class OpSchema(object):
 
         # TODO: add schema constraint, 
         cons = base.SigRankValueConstraint(arg_name, sig)
-        for idx in sig:
-            pri_idx = self.index[idx].pri_idx
+        for pri_idx in self._pri_indices(sig):
             inode = self.inf_graph[pri_idx]
             inode.func.add_args_constraint(cons)
-            inode.append_parent_sn(self.obs_args)
+            inode.maybe_append_parent_sn(self.obs_args)
 
     def rank_dims_constraint(self, func, rank_sig, shape_arg):
         """
         Expresses the constraint RANK(rank_sig) = func(obs_shapes[shape_arg]).
         """
+        rank_sig = self._check_sig(rank_sig, shape_arg)
         # add the constraint to the inference graph 
         cons = base.ShapeFuncConstraint(rank_sig, func, shape_arg)
-        for idx in rank_sig:
-            pri_idx = self.index[idx].pri_idx
+        for pri_idx in self._pri_indices(rank_sig):
             inode = self.inf_graph[pri_idx]
             inode.func.add_shapes_constraint(cons)
-            inode.append_parent_sn(self.obs_shapes)
+            inode.maybe_append_parent_sn(self.obs_shapes)
+
+    def _check_pred_funcs(self, pred_name, indices, *funcs):
+        """
+        Check at registration that each of {funcs} accepts one argument per
+        index in {indices}, rather than failing when the predicate is first
+        evaluated.  Functions without an inspectable signature are skipped.
+        """
+        for func in funcs:
+            try:
+                func_sig = inspect.signature(func)
+            except (TypeError, ValueError):
+                continue
+            try:
+                func_sig.bind(*indices)
+            except TypeError as ex:
+                raise SchemaError(
+                    f'{type(self).__qualname__}: function {func} for dims '
+                    f'predicate \'{pred_name}\' cannot be called with one '
+                    f'argument for each of the indices \'{indices}\': {ex}')
 
     def dims_pred(self, pred_name, pfunc, pfunc_t, indices):
         """
@@ -1744,6 +2102,7 @@ class OpSchema(object):
         calls, which accept non-index parameters.  Then, use that intermediate
         index in a predicate.
         """
+        self._check_pred_funcs(pred_name, indices, pfunc, pfunc_t)
         pred = base.IndexPredicate(pred_name, False, pfunc, pfunc_t, indices)
         self.index_preds.append(pred)
 
@@ -1752,6 +2111,7 @@ class OpSchema(object):
         Like dims_pred, but pfunc is called 'component-wise'.  That is, it is
         called once for each set of broadcasted index shapes.
         """
+        self._check_pred_funcs(pred_name, indices, pfunc, pfunc_t)
         pred = base.IndexPredicate(pred_name, True, pfunc, pfunc_t, indices)
         self.index_preds.append(pred)
 
@@ -1765,29 +2125,23 @@ class OpSchema(object):
                 f'dims_pred_rng: error adding dims pred for {idx}.  '
                 f'at least one of lo or hi must be an integer')
 
-        leq = lambda v, m: v <= m
-        leq_t = lambda v, m: f'{v} must be <= {m}'
-        geq = lambda v, m: v >= m
-        geq_t = lambda v, m: f'{v} must be >= {m}'
-        betw = lambda v, lo, hi: lo <= v <= hi
-        betw_t = lambda v, lo, hi: f'{v} must be in [{lo}, {hi}]'
-
-        leq = Partial(leq, hi)
-        leq_t = Partial(leq_t, hi)
-
-        geq = Partial(geq, lo)
-        geq_t = Partial(geq_t, lo)
-
-        betw = Partial(betw, lo, hi)
-        betw_t = Partial(betw_t, lo, hi)
-
+        # Only the pair for the branch taken is built.  The one-sided checks
+        # are partials of the C comparison operators, so they are evaluated
+        # without a Python frame.  operator.ge(hi, v) is v <= hi.  The
+        # two-sided check and the templates are ordinary closures
         if lo is None:
-            self.dims_pred_cw(f'{idx} >= {lo}', leq, leq_t, idx)  
+            pfunc = functools.partial(operator.ge, hi)
+            pfunc_t = lambda v: f'{v} must be <= {hi}'
+            name = f'{idx} <= {hi}'
         elif hi is None:
-            self.dims_pred_cw(f'{idx} >= {lo}', geq, geq_t, idx)  
+            pfunc = functools.partial(operator.le, lo)
+            pfunc_t = lambda v: f'{v} must be >= {lo}'
+            name = f'{idx} >= {lo}'
         else:
+            pfunc = lambda v: lo <= v <= hi
+            pfunc_t = lambda v: f'{v} must be in [{lo}, {hi}]'
             name = f'{idx} in [{lo}, {hi}]'
-            self.dims_pred_cw(name, betw, betw_t, idx) 
+        self.dims_pred_cw(name, pfunc, pfunc_t, idx)
 
     def return_tensor(self, *sigs):
         """
@@ -1800,27 +2154,12 @@ class OpSchema(object):
         """
         index = self.num_returns
         ret_name = f'return[{index}]'
-        self.return_tensors.append(ret_name)
+        # validate before recording anything, so a bad call leaves no trace
         sigs_list = self._check_sigs_layout(ret_name, sigs)
+        self.return_tensors.append(ret_name)
+        self.tensor_names.add(ret_name)
 
-        P.set_registry(self.pred_graph)
-        G.set_registry(self.gen_graph)
-
-        g_sig_obj = ge.Sig(self, ret_name, sigs_list)
-
-        G.set_registry(self.gen_graph)
-        sigmap_gnode = self._gen_node(ge.SigMap)
-        layout_gnode = self._gen_node(ge.Layout, base.LAYOUT)
-        sig_gobj = ge.Sig(self, ret_name, sigs_list)
-        sig_gnode = G.add_node(sig_gobj, layout_gnode)
-        sigmap_gnode.append_parent_sn(sig_gnode)
-
-        G.set_registry(self.inf_graph)
-        layout_inode = self._inf_node(ge.Layout)
-        sig_iobj = ge.Sig(self, ret_name, sigs_list)
-        sig_inode = G.add_node(sig_iobj, layout_inode)
-        sigmap_inode = self._inf_node(ge.SigMap)
-        sigmap_inode.append_parent_sn(sig_inode)
+        self._add_sig_nodes(ret_name, sigs_list)
 
         self.num_returns += 1
 
@@ -1829,8 +2168,10 @@ class OpSchema(object):
         nodes = list(nodes)
         dot = graphviz.Digraph(graph_attr={'rankdir': 'LR'}, format='svg')
         names = { n.name: n.func.graphviz_name for n in nodes }
+        # node names repeat across graphs, so arg nodes are found by identity
+        arg_nodes = set(self.arg_gen_nodes.values())
         for node in nodes:
-            is_arg = (node in self.arg_gen_nodes.values())
+            is_arg = (node in arg_nodes)
             color = 'red' if is_arg else 'black'
             dot.node(names[node.name], names[node.name], color=color)
             vtype = node.vararg_type
@@ -1,4 +1,3 @@
-import fire
 import opschema
 import random
 import numpy as np
@@ -15,5 +14,7 @@ def main(out_dir, op_path, test_ids=None, skip_ids=None, dtype_err_quota=2):
     opschema.validate(op_path, out_dir, test_ids, skip_ids, dtype_err_quota)
 
 if __name__ == '__main__':
+    # only the command-line entry point needs fire
+    import fire
     fire.Fire(main)
 
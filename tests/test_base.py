@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from opschema import base
+
+
+def make_rules(*field_val_pairs):
+    rules = base.DTypeRules()
+    rules.init_fields(['x', 'y'], ['i'])
+    rules.add_combo(*field_val_pairs)
+    return rules
+
+
+def test_two_tensor_combo_keeps_both_tensors():
+    combo = make_rules('x', 'int32', 'y', 'float32').combos[0]
+    assert set(combo.dtypes.keys()) == {'x', 'y'}
+    assert combo.match({'x': 'int32', 'y': 'float32'}, {'i': 1}, 0)
+
+
+def test_two_tensor_combo_requires_both_tensors():
+    combo = make_rules('x', 'int32', 'y', 'float32').combos[0]
+    # only the combination is excluded, not each dtype on its own
+    assert not combo.match({'x': 'int32', 'y': 'int32'}, {'i': 1}, 0)
+    assert not combo.match({'x': 'float32', 'y': 'float32'}, {'i': 1}, 0)
+
+
+def test_combo_dtypes_are_deduplicated():
+    combo = make_rules('x', ('int32', 'int32')).combos[0]
+    assert combo.dtypes['x'] == ['int32']
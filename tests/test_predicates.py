@@ -0,0 +1,44 @@
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from opschema import predicates as pr
+
+
+class FakeOp(object):
+    def __init__(self, **arguments):
+        self.arguments = arguments
+
+    def _get_arg(self, arg_name):
+        return self.arguments[arg_name]
+
+
+def partial_shape_tensor():
+    # a symbolic int32 tensor [?, 3, 4] whose first element is unknown
+    with tf.Graph().as_default():
+        batch = tf.compat.v1.placeholder(tf.int32, [])
+        return tf.stack([batch, 3, 4])
+
+
+def test_shape_tensor_partially_known_value():
+    def pred_func(shape):
+        if any(d > 10 for d in shape):
+            return False, None
+        return True, shape
+
+    pred = pr.ShapeTensorFunc('output_shape', None, pred_func, 0, None)
+    op = FakeOp(output_shape=partial_shape_tensor())
+    assert pred(op) == (True, [None, 3, 4])
+
+
+def test_shape_tensor_partially_known_value_checks_known_elements():
+    pred = pr.ShapeTensor('output_shape', None, 4, None)
+    op = FakeOp(output_shape=partial_shape_tensor())
+    valid, _ = pred(op)
+    assert not valid
+
+
+def test_shape_tensor_eager_value():
+    pred = pr.ShapeTensor('output_shape', None, 0, None)
+    op = FakeOp(output_shape=tf.constant([2, 3, 4]))
+    assert pred(op) == (True, [2, 3, 4])